@@ -0,0 +1,280 @@
+"""Compact binary roster archives; fixed-width records with a memory-mapped random-access reader."""
+
+import mmap
+import os
+import struct
+from uuid import UUID
+from zlib import crc32
+
+from src import data_bg3
+from src.models import AbilityScores, Character
+
+MAGIC = b"BG3A"
+VERSION = 1
+
+# magic, version, name width in bytes, catalog checksum, record count
+_HEADER = struct.Struct("<4sHHIQ")
+
+# Lists hold at most 16 entries, so each position's rank fits in a nibble
+MAX_LIST_ITEMS = 16
+
+_ABILITIES = data_bg3.ABILITY_SCORES
+
+# Indexes stored in the archive point into these lists; the checksum in the header
+# makes a reader refuse archives written against different data_bg3 tables
+_CATALOG = (
+    data_bg3.ORIGINS,
+    data_bg3.RACES,
+    data_bg3.CLASSES,
+    data_bg3.SUBCLASSES_BY_CLASS,
+    data_bg3.BACKGROUNDS,
+    _ABILITIES,
+    data_bg3.SKILLS,
+    data_bg3.FEATS,
+)
+CATALOG_CHECKSUM = crc32(repr(_CATALOG).encode("utf-8"))
+
+if len(data_bg3.SKILLS) > 32 or len(data_bg3.FEATS) > 64:
+    raise RuntimeError("Skill or feat list too long for the archive bitmasks")
+
+
+def _record_struct(name_width):
+    # id, name length, name, origin, race, class, subclass within class, background,
+    # final scores, bonus values, bonus mask, bonus order, skill mask, skill order,
+    # feat mask, feat order
+    return struct.Struct(f"<16sB{name_width}s5B6s6bB3sI8sQ8s")
+
+
+def _indexes(values):
+    return {value: index for index, value in enumerate(values)}
+
+
+_ORIGIN_INDEX = _indexes(data_bg3.ORIGINS)
+_RACE_INDEX = _indexes(data_bg3.RACES)
+_CLASS_INDEX = _indexes(data_bg3.CLASSES)
+_SUBCLASS_INDEX = {
+    char_class: _indexes(subclasses)
+    for char_class, subclasses in data_bg3.SUBCLASSES_BY_CLASS.items()
+}
+_BACKGROUND_INDEX = _indexes(data_bg3.BACKGROUNDS)
+_ABILITY_INDEX = _indexes(_ABILITIES)
+_SKILL_INDEX = _indexes(data_bg3.SKILLS)
+_FEAT_INDEX = _indexes(data_bg3.FEATS)
+
+
+def _index(table, value, field):
+    try:
+        return table[value]
+    except (KeyError, TypeError):
+        raise ValueError(f"Cannot archive {field} {value!r}") from None
+
+
+# Encoding a list of distinct catalog entries as (bitmask, nibble-packed order); the
+# bitmask says which entries are present and the order gives, for each list position,
+# the rank of its entry among the present ones
+def _encode_list(values, table, field, order_bytes):
+    if len(values) > min(MAX_LIST_ITEMS, order_bytes * 2):
+        raise ValueError(f"Too many {field} to archive: {len(values)}")
+    indexes = [_index(table, value, field) for value in values]
+    if len(set(indexes)) != len(indexes):
+        raise ValueError(f"Cannot archive duplicate {field}: {values!r}")
+
+    ranks = {index: rank for rank, index in enumerate(sorted(indexes))}
+    order = bytearray(order_bytes)
+    mask = 0
+    for position, index in enumerate(indexes):
+        mask |= 1 << index
+        order[position >> 1] |= ranks[index] << ((position & 1) * 4)
+    return mask, bytes(order)
+
+
+def _decode_list(mask, order, values):
+    present = [value for bit, value in enumerate(values) if mask >> bit & 1]
+    return [
+        present[order[position >> 1] >> ((position & 1) * 4) & 0xF]
+        for position in range(len(present))
+    ]
+
+
+def _canonical_uuid(char_id):
+    try:
+        uuid = UUID(char_id)
+    except (TypeError, ValueError, AttributeError):
+        uuid = None
+    if uuid is None or str(uuid) != char_id:
+        raise ValueError(f"Cannot archive non-canonical id {char_id!r}")
+    return uuid.bytes
+
+
+class ArchiveWriter:
+    # Writes records to a temporary file next to path as they come; close() fills in the
+    # record count and moves it into place, abort() (or an exception inside a with block)
+    # deletes it, so a failed write never leaves a valid-looking partial archive
+    def __init__(self, path, name_width=64):
+        if not 1 <= name_width <= 255:
+            raise ValueError(f"name_width must be between 1 and 255, got {name_width}")
+        self.path = os.fspath(path)
+        self.name_width = name_width
+        self.count = 0
+        self._record = _record_struct(name_width)
+        self._temp_path = self.path + ".tmp"
+        self._file = open(self._temp_path, "wb")  # pylint: disable=consider-using-with
+        self._file.write(_HEADER.pack(MAGIC, VERSION, name_width, CATALOG_CHECKSUM, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _pack(self, character):
+        name = character.name.encode("utf-8")
+        if len(name) > self.name_width:
+            raise ValueError(
+                f"Name {character.name!r} is longer than {self.name_width} bytes"
+            )
+        bonuses = character.ability_bonuses
+        bonus_mask, bonus_order = _encode_list(
+            list(bonuses), _ABILITY_INDEX, "ability bonuses", 3
+        )
+        skill_mask, skill_order = _encode_list(character.skills, _SKILL_INDEX, "skills", 8)
+        feat_mask, feat_order = _encode_list(character.feats, _FEAT_INDEX, "feats", 8)
+        subclasses = _SUBCLASS_INDEX.get(character.character_class, {})
+
+        return self._record.pack(
+            _canonical_uuid(character.id),
+            len(name),
+            name,
+            _index(_ORIGIN_INDEX, character.origin, "origin"),
+            _index(_RACE_INDEX, character.race, "race"),
+            _index(_CLASS_INDEX, character.character_class, "class"),
+            _index(subclasses, character.subclass, "subclass"),
+            _index(_BACKGROUND_INDEX, character.background, "background"),
+            bytes(character.ability_scores.as_dict().values()),
+            *(bonuses.get(ability, 0) for ability in _ABILITIES),
+            bonus_mask,
+            bonus_order,
+            skill_mask,
+            skill_order,
+            feat_mask,
+            feat_order,
+        )
+
+    def write(self, character):
+        try:
+            record = self._pack(character)
+        except struct.error as error:
+            raise ValueError(f"Cannot archive character {character.id!r}: {error}") from None
+        self._file.write(record)
+        self.count += 1
+
+    def write_many(self, characters):
+        for character in characters:
+            self.write(character)
+        return self.count
+
+    def close(self):
+        if self._file.closed:
+            return
+        try:
+            self._file.seek(0)
+            self._file.write(
+                _HEADER.pack(MAGIC, VERSION, self.name_width, CATALOG_CHECKSUM, self.count)
+            )
+            self._file.close()
+            os.replace(self._temp_path, self.path)
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self):    # Dropping everything written so far; path is left untouched
+        self._file.close()
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+
+# Writing any iterable of characters to an archive file; returns how many were written
+def write_archive(characters, path, name_width=64):
+    with ArchiveWriter(path, name_width) as writer:
+        return writer.write_many(characters)
+
+
+class ArchiveReader:
+    # Maps the file and decodes one record per access, so reading record i touches only
+    # that record's bytes
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError(f"{path} is not a BG3 character archive")
+            magic, version, name_width, checksum, count = _HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a BG3 character archive")
+            if version != VERSION:
+                raise ValueError(f"Unsupported archive version {version} in {path}")
+            if checksum != CATALOG_CHECKSUM:
+                raise ValueError(f"{path} was written against different game data")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._record = _record_struct(name_width)
+        self._count = count
+        if len(self._map) != _HEADER.size + count * self._record.size:
+            self._map.close()
+            raise ValueError(f"{path} is truncated or has trailing data")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self._map.close()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("archive index out of range")
+        return self._unpack(
+            self._record.unpack_from(self._map, _HEADER.size + index * self._record.size)
+        )
+
+    def __iter__(self):
+        unpack_from = self._record.unpack_from
+        size = self._record.size
+        for offset in range(_HEADER.size, _HEADER.size + self._count * size, size):
+            yield self._unpack(unpack_from(self._map, offset))
+
+    @staticmethod
+    def _unpack(fields):
+        (
+            id_bytes, name_length, name, origin, race, char_class, subclass, background,
+            scores, *rest
+        ) = fields
+        bonus_values = rest[:6]
+        bonus_mask, bonus_order, skill_mask, skill_order, feat_mask, feat_order = rest[6:]
+
+        class_name = data_bg3.CLASSES[char_class]
+        bonus_abilities = _decode_list(bonus_mask, bonus_order, _ABILITIES)
+        return Character(
+            id=str(UUID(bytes=id_bytes)),
+            name=name[:name_length].decode("utf-8"),
+            origin=data_bg3.ORIGINS[origin],
+            race=data_bg3.RACES[race],
+            character_class=class_name,
+            subclass=data_bg3.SUBCLASSES_BY_CLASS[class_name][subclass],
+            background=data_bg3.BACKGROUNDS[background],
+            ability_scores=AbilityScores(*scores),
+            ability_bonuses={
+                ability: bonus_values[_ABILITY_INDEX[ability]] for ability in bonus_abilities
+            },
+            skills=_decode_list(skill_mask, skill_order, data_bg3.SKILLS),
+            feats=_decode_list(feat_mask, feat_order, data_bg3.FEATS),
+        )
@@ -1,7 +1,17 @@
 """Functions to export character data to text, JSON and HTML formats."""
 
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import csv
 import json
+import os
+
+from src import utils
+from src.html_templates import Template, join_markup
+from src.models import AbilityScores
+
+_WRITE_BUFFER = 1 << 20  # 1 MiB file buffer for roster exports
 
 # Returning a plain text representation of the character
 def character_to_text(character):
@@ -43,35 +53,33 @@ def export_to_txt(character, path):
     path = Path(path)
     path.write_text(character_to_text(character), encoding="utf-8")
 
+# Returning the character as indented JSON
+def character_to_json(character):
+    return json.dumps(character.to_dict(), indent=2)
+
 # Writing character as JSON to a file
 def export_to_json(character, path):
     path = Path(path)
-    data = character.to_dict()
-    path.write_text(json.dumps(data, indent=2), encoding="utf-8")
-
-# Returning an HTML representation of the character
-def character_to_html(character):
-    ab = character.ability_scores.as_dict()
-    skills = ", ".join(character.skills) if character.skills else "None"
-    feats = ", ".join(character.feats) if character.feats else "None"
+    path.write_text(character_to_json(character), encoding="utf-8")
 
-    rows = ""
-    for ability, value in ab.items():
-        bonus = character.ability_bonuses.get(ability, 0)
-        rows += f"<tr><td>{ability}</td><td>{value}</td><td>{bonus}</td></tr>"
+# Ability rows are part of the page template, with one score and one bonus field each
+_ABILITY_ROWS = "".join(
+    f"<tr><td>{ability}</td><td>{{{ability}_score}}</td><td>{{{ability}_bonus}}</td></tr>"
+    for ability in AbilityScores.FIELDS
+)
 
-    html = f"""<!DOCTYPE html>
+_CHARACTER_PAGE = Template("""<!DOCTYPE html>
 <html>
 <head>
     <meta charset="utf-8" />
-    <title>BG3 Character: {character.name}</title>
+    <title>BG3 Character: {name}</title>
 </head>
 <body>
-    <h1>{character.name}</h1>
-    <p><strong>Origin:</strong> {character.origin}</p>
-    <p><strong>Race:</strong> {character.race}</p>
-    <p><strong>Class:</strong> {character.character_class} ({character.subclass})</p>
-    <p><strong>Background:</strong> {character.background}</p>
+    <h1>{name}</h1>
+    <p><strong>Origin:</strong> {origin}</p>
+    <p><strong>Race:</strong> {race}</p>
+    <p><strong>Class:</strong> {character_class} ({subclass})</p>
+    <p><strong>Background:</strong> {background}</p>
 
     <h2>Ability Scores</h2>
     <table border="1" cellpadding="4">
@@ -79,7 +87,7 @@ def character_to_html(character):
             <tr><th>Ability</th><th>Score</th><th>Bonus</th></tr>
         </thead>
         <tbody>
-            {rows}
+            """ + _ABILITY_ROWS + """
         </tbody>
     </table>
 
@@ -90,10 +98,261 @@ def character_to_html(character):
     <p>{feats}</p>
 </body>
 </html>
-"""
-    return html
+""")
+
+# Values for the {STR_score}, {STR_bonus}... fields of _CHARACTER_PAGE
+def _ability_values(character):
+    bonuses = character.ability_bonuses
+    values = {}
+    for ability, score in character.ability_scores.as_dict().items():
+        values[f"{ability}_score"] = score
+        values[f"{ability}_bonus"] = bonuses.get(ability, 0)
+    return values
+
+# Returning an HTML representation of the character
+def character_to_html(character):
+    return _CHARACTER_PAGE.render(
+        name=character.name,
+        origin=character.origin,
+        race=character.race,
+        character_class=character.character_class,
+        subclass=character.subclass,
+        background=character.background,
+        **_ability_values(character),
+        skills=", ".join(character.skills) if character.skills else "None",
+        feats=", ".join(character.feats) if character.feats else "None",
+    )
 
 # Writing character as HTML to a file
 def export_to_html(character, path):
     path = Path(path)
     path.write_text(character_to_html(character), encoding="utf-8")
+
+# Streaming any iterable of characters (a list, a generator, storage.iter_characters()...)
+# to a JSON Lines file, one compact JSON object per line; returns how many were written
+def export_roster_jsonl(characters, path):
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    count = 0
+    with open(path, "w", encoding="utf-8", buffering=_WRITE_BUFFER) as f:
+        write = f.write
+        for character in characters:
+            write(dumps(character.to_dict()))
+            write("\n")
+            count += 1
+    return count
+
+# CSV columns; skills and feats are joined with ";"
+ROSTER_CSV_COLUMNS = (
+    ["id", "name", "origin", "race", "character_class", "subclass", "background"]
+    + list(AbilityScores.FIELDS)
+    + [f"{ability}_bonus" for ability in AbilityScores.FIELDS]
+    + ["skills", "feats"]
+)
+
+def _csv_row(character):
+    scores = character.ability_scores.as_dict()
+    bonuses = character.ability_bonuses
+    return (
+        [
+            character.id,
+            character.name,
+            character.origin,
+            character.race,
+            character.character_class,
+            character.subclass,
+            character.background,
+        ]
+        + [scores[ability] for ability in AbilityScores.FIELDS]
+        + [bonuses.get(ability, 0) for ability in AbilityScores.FIELDS]
+        + [";".join(character.skills), ";".join(character.feats)]
+    )
+
+# Streaming any iterable of characters to one CSV file with a header row;
+# returns how many characters were written
+def export_roster_csv(characters, path):
+    count = 0
+
+    def rows():
+        nonlocal count
+        for character in characters:
+            count += 1
+            yield _csv_row(character)
+
+    with open(path, "w", encoding="utf-8", newline="", buffering=_WRITE_BUFFER) as f:
+        writer = csv.writer(f)
+        writer.writerow(ROSTER_CSV_COLUMNS)
+        writer.writerows(rows())
+    return count
+
+# Roster report columns as (header, sort type)
+_ROSTER_HTML_COLUMNS = (
+    [("Name", "text"), ("Origin", "text"), ("Race", "text"), ("Class", "text"),
+     ("Subclass", "text"), ("Background", "text")]
+    + [(ability, "number") for ability in AbilityScores.FIELDS]
+    + [("Skills", "text"), ("Feats", "text")]
+)
+
+_ROSTER_HEADER = Template("""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8" />
+    <title>{title}</title>
+    <style>
+        body {{ font-family: sans-serif; }}
+        table {{ border-collapse: collapse; }}
+        th, td {{ border: 1px solid #999; padding: 4px 8px; }}
+        th {{ cursor: pointer; background: #eee; }}
+        th[aria-sort="ascending"]::after {{ content: " \\25B2"; }}
+        th[aria-sort="descending"]::after {{ content: " \\25BC"; }}
+    </style>
+</head>
+<body>
+    <h1>{title}</h1>
+    <table id="roster">
+        <thead>
+            <tr>{headers}</tr>
+        </thead>
+        <tbody>
+""")
+
+_ROSTER_HEADER_CELL = Template('<th data-type="{sort_type}">{label}</th>')
+
+_ROSTER_ROW = Template(
+    "            <tr><td>{name}</td><td>{origin}</td><td>{race}</td><td>{character_class}</td>"
+    "<td>{subclass}</td><td>{background}</td>{scores}<td>{skills}</td><td>{feats}</td></tr>\n"
+)
+
+_ROSTER_SCORE_CELL = Template("<td>{value}</td>")
+
+# Clicking a header sorts by that column; clicking again reverses the order
+_ROSTER_FOOTER = """        </tbody>
+    </table>
+    <script>
+    document.querySelectorAll("#roster th").forEach(function (th, column) {
+        th.addEventListener("click", function () {
+            var tbody = document.querySelector("#roster tbody");
+            var numeric = th.dataset.type === "number";
+            var ascending = th.getAttribute("aria-sort") !== "ascending";
+            var rows = Array.prototype.slice.call(tbody.rows);
+            rows.sort(function (a, b) {
+                var x = a.cells[column].textContent, y = b.cells[column].textContent;
+                var order = numeric ? x - y : x.localeCompare(y);
+                return ascending ? order : -order;
+            });
+            document.querySelectorAll("#roster th").forEach(function (other) {
+                other.removeAttribute("aria-sort");
+            });
+            th.setAttribute("aria-sort", ascending ? "ascending" : "descending");
+            rows.forEach(function (row) { tbody.appendChild(row); });
+        });
+    });
+    </script>
+</body>
+</html>
+"""
+
+def _roster_row(character):
+    return _ROSTER_ROW.render(
+        name=character.name,
+        origin=character.origin,
+        race=character.race,
+        character_class=character.character_class,
+        subclass=character.subclass,
+        background=character.background,
+        scores=join_markup(
+            _ROSTER_SCORE_CELL.render(value=value)
+            for value in character.ability_scores.as_dict().values()
+        ),
+        skills=", ".join(character.skills),
+        feats=", ".join(character.feats),
+    )
+
+# Writing many characters into one sortable HTML table; the page header, styles and script
+# are rendered once and the rows are streamed. Returns how many characters were written.
+def export_roster_html(characters, path, title="BG3 Roster"):
+    count = 0
+    headers = join_markup(
+        _ROSTER_HEADER_CELL.render(label=label, sort_type=sort_type)
+        for label, sort_type in _ROSTER_HTML_COLUMNS
+    )
+    with open(path, "w", encoding="utf-8", buffering=_WRITE_BUFFER) as f:
+        f.write(_ROSTER_HEADER.render(title=title, headers=headers))
+        for character in characters:
+            f.write(_roster_row(character))
+            count += 1
+        f.write(_ROSTER_FOOTER)
+    return count
+
+# File exporters by extension
+EXPORTERS = {
+    "txt": export_to_txt,
+    "json": export_to_json,
+    "html": export_to_html,
+}
+
+# Rendering a character to the contents of one export file, by extension
+RENDERERS = {
+    "txt": character_to_text,
+    "json": character_to_json,
+    "html": character_to_html,
+}
+
+# One export_directory() manifest entry; files maps each format to the written path
+ExportedCharacter = namedtuple("ExportedCharacter", ["id", "name", "files"])
+
+# Picking a file stem for a name that no earlier character in this export used:
+# gale, gale-2, gale-3... taken maps every used stem to the last suffix tried for it
+def _unique_stem(name, taken):
+    stem = Path(utils.default_export_filename(name, "txt")).stem
+    candidate = stem
+    suffix = taken.get(stem, 0)
+    while candidate in taken:
+        suffix += 1
+        candidate = f"{stem}-{suffix}"
+    taken[stem] = max(suffix, 1)
+    taken.setdefault(candidate, 1)
+    return candidate
+
+# Rendering and writing every file of one character; runs on the export pool
+def _write_files(character, files):
+    for export_format, path in files.items():
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(RENDERERS[export_format](character))
+
+# Exporting many characters into one directory, one file per format each, named after the
+# characters. File names are assigned up front in input order, so they never collide and
+# don't depend on scheduling. Workers render and write on a thread pool (one worker runs
+# inline); returns the manifest as a list of ExportedCharacter in input order.
+def export_directory(characters, out_dir, formats=("txt", "json", "html"), workers=None):
+    for export_format in formats:
+        if export_format not in RENDERERS:
+            raise ValueError(f"Unknown export format: {export_format}")
+    directory = utils.ensure_directory(out_dir)
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    taken = {}
+    manifest = []
+
+    def jobs():
+        for character in characters:
+            stem = _unique_stem(character.name, taken)
+            files = {
+                export_format: directory / f"{stem}.{export_format}"
+                for export_format in formats
+            }
+            manifest.append(ExportedCharacter(character.id, character.name, files))
+            yield character, files
+
+    if workers == 1:
+        for character, files in jobs():
+            _write_files(character, files)
+        return manifest
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bg3-export") as pool:
+        pending = deque()
+        for character, files in jobs():
+            pending.append(pool.submit(_write_files, character, files))
+            if len(pending) >= workers * 2:
+                pending.popleft().result()
+        while pending:
+            pending.popleft().result()
+    return manifest
@@ -0,0 +1,56 @@
+"""Small precompiled HTML templates; values are escaped unless marked as Markup."""
+
+from html import escape
+from string import Formatter
+
+
+class Markup(str):  # Already-safe HTML that templates insert as is
+    __slots__ = ()
+
+
+# Escaping one value for HTML text or a quoted attribute
+def html_value(value):
+    if isinstance(value, Markup):
+        return value
+    if value is None:
+        return ""
+    return escape(str(value), quote=True)
+
+
+# Joining already rendered fragments into one Markup value
+def join_markup(fragments, separator=""):
+    return Markup(separator.join(fragments))
+
+
+class Template:
+    # The source is split into literal text and {field} names once; render() escapes the
+    # values and joins them with the literals. Literal braces are written {{ and }} as with
+    # str.format.
+    __slots__ = ("fields", "_head", "_tails")
+
+    def __init__(self, source):
+        self._head = ""
+        self.fields = []
+        self._tails = []  # Literal text following each field
+        for literal, field, spec, conversion in Formatter().parse(source):
+            if self.fields:
+                self._tails[-1] += literal
+            else:
+                self._head += literal
+            if field is None:
+                continue
+            if spec or conversion or not field.isidentifier():
+                raise ValueError(f"Unsupported template field: {{{field}}}")
+            self.fields.append(field)
+            self._tails.append("")
+
+    def render(self, **values):
+        try:
+            escaped = [html_value(values[field]) for field in self.fields]
+        except KeyError as error:
+            raise ValueError(f"Missing template value: {error.args[0]}") from None
+        parts = [self._head]
+        for value, tail in zip(escaped, self._tails):
+            parts.append(value)
+            parts.append(tail)
+        return Markup("".join(parts))
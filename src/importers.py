@@ -0,0 +1,301 @@
+"""Streaming import of exported JSON / JSON Lines character files into CharacterStorage."""
+
+from collections import namedtuple
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+import json
+from uuid import uuid4
+
+from src import data_bg3
+from src import utils
+from src.models import AbilityScores, Character
+from src.validation import VALIDATOR
+
+# What to do with a record whose id is already saved (or repeated in the file):
+# keep the saved one, overwrite it, import under a fresh id, or stop the import
+CONFLICT_POLICIES = ("skip", "replace", "new_id", "error")
+
+_READ_CHUNK = 1 << 16           # Characters read at a time from JSON array files
+_MAX_RECORD_SIZE = 1 << 24      # Largest single array element buffered before giving up
+
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789+-.eE"
+
+# One rejected record; record is the 1-based array position or JSONL line number
+ImportIssue = namedtuple("ImportIssue", ["record", "id", "errors"])
+
+
+@dataclass
+class ImportReport:     # Counts for one import_characters run
+    read: int = 0
+    imported: int = 0   # Written to storage, replaced and renamed records included
+    replaced: int = 0
+    renamed: int = 0
+    skipped: int = 0
+    invalid: int = 0
+    errors: list = field(default_factory=list)  # First ImportIssues, up to max_errors
+
+    @property
+    def ok(self):
+        return not self.invalid
+
+
+# Yielding (array position, value) from a top-level JSON array, decoding one element at a
+# time from a buffer that only ever holds the element being read plus one chunk
+def _iter_json_array(f):
+    decode = json.JSONDecoder().raw_decode
+    buffer = ""
+    pos = 0
+    offset = 0  # Characters dropped from the front of the buffer so far
+    eof = False
+
+    def more():
+        nonlocal buffer, pos, offset, eof
+        chunk = f.read(_READ_CHUNK)
+        eof = not chunk
+        offset += pos
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        if len(buffer) > _MAX_RECORD_SIZE:
+            raise ValueError(f"JSON element at character {offset} is malformed or too large")
+        return chunk
+
+    def next_token():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if not more():
+                raise ValueError("Unexpected end of file inside the JSON array")
+
+    if next_token() != "[":
+        raise ValueError("Expected a JSON array of characters")
+    pos += 1
+    if next_token() == "]":
+        return
+
+    number = 0
+    while True:
+        # A value that ends exactly at the end of the buffer may continue in the next chunk;
+        # so may a number followed only by characters a number can hold ("1." of "1.5")
+        while True:
+            try:
+                value, end = decode(buffer, pos)
+                complete = end < len(buffer) and not (
+                    isinstance(value, (int, float)) and not buffer[end:].lstrip(_NUMBER_CHARS)
+                )
+                if complete or eof:
+                    break
+            except json.JSONDecodeError as error:
+                if eof:
+                    raise ValueError(
+                        f"Invalid JSON at character {offset + error.pos}: {error.msg}"
+                    ) from None
+            more()
+
+        number += 1
+        yield number, value
+        pos = end
+
+        token = next_token()
+        pos += 1
+        if token == "]":
+            return
+        if token != ",":
+            raise ValueError(f"Expected ',' or ']' at character {offset + pos - 1}")
+        next_token()    # raw_decode doesn't skip leading whitespace
+
+
+# Yielding (line number, value or None, error or None) from a JSON Lines file; a bad line
+# is reported and skipped, blank lines are ignored
+def _iter_json_lines(f):
+    for number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line), None
+        except json.JSONDecodeError as error:
+            yield number, None, f"Invalid JSON: {error.msg}"
+
+
+# Yielding (record number, value, error) from a JSON array or JSON Lines file, told apart
+# by the first non-blank character
+def iter_records(f):
+    start = f.read(1)
+    while start and start in _WHITESPACE:
+        start = f.read(1)
+    f.seek(0)
+    if start == "[":
+        for number, value in _iter_json_array(f):
+            yield number, value, None
+    else:
+        yield from _iter_json_lines(f)
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+# Checking the JSON types of a record before any lookups, so a malformed value becomes an
+# error message instead of a TypeError
+def _type_errors(record):
+    errors = [
+        f"Invalid {name}: {record[name]!r}"
+        for name in ("name", "origin", "race", "character_class", "subclass", "background")
+        if not isinstance(record[name], str)
+    ]
+
+    scores = record["ability_scores"]
+    if (
+        not isinstance(scores, dict)
+        or scores.keys() != set(data_bg3.ABILITY_SCORES)
+        or not all(_is_int(value) for value in scores.values())
+    ):
+        errors.append(
+            "Ability scores must include all abilities: " + ", ".join(data_bg3.ABILITY_SCORES)
+        )
+
+    bonuses = record.get("ability_bonuses") or {}
+    if not isinstance(bonuses, dict) or not all(_is_int(value) for value in bonuses.values()):
+        errors.append("Ability bonuses must map abilities to whole numbers")
+
+    for name in ("skills", "feats"):
+        values = record.get(name) or []
+        if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+            errors.append(f"{name.capitalize()} must be a list of names")
+    return errors
+
+
+# Turning one exported record (Character.to_dict() layout) into a character, or a list of
+# errors. Exports hold final scores, so base scores are the final ones minus the bonuses
+# and the +2/+1 abilities come from the bonus dict; both then go through VALIDATOR.
+def record_to_character(record):
+    if not isinstance(record, dict):
+        return None, ["Record is not a JSON object"]
+
+    missing = [
+        name
+        for name in ("id", "name", "origin", "race", "character_class", "subclass",
+                     "background", "ability_scores")
+        if name not in record
+    ]
+    if missing:
+        return None, [f"Missing field: {name}" for name in missing]
+
+    char_id = record["id"]
+    if not isinstance(char_id, str) or not char_id:
+        return None, [f"Invalid id: {char_id!r}"]
+
+    errors = _type_errors(record)
+    if errors:
+        return None, errors
+
+    scores = record["ability_scores"]
+    bonuses = record.get("ability_bonuses") or {}
+    if sorted(bonuses.values()) != [1, 2]:
+        return None, ["Ability bonuses must be one +2 and one +1"]
+
+    plus_two = next(ability for ability, bonus in bonuses.items() if bonus == 2)
+    plus_one = next(ability for ability, bonus in bonuses.items() if bonus == 1)
+    skills = record.get("skills") or []
+    feats = record.get("feats") or []
+
+    choices = {
+        "name": record["name"],
+        "origin": record["origin"],
+        "race": record["race"],
+        "character_class": record["character_class"],
+        "subclass": record["subclass"],
+        "background": record["background"],
+        "base_scores": {
+            ability: score - bonuses.get(ability, 0) for ability, score in scores.items()
+        },
+        "plus_two_ability": plus_two,
+        "plus_one_ability": plus_one,
+        "skills": skills,
+        "feats": feats,
+    }
+    errors = VALIDATOR.errors(choices)
+    if errors:
+        return None, errors
+
+    return Character(
+        id=char_id,
+        name=record["name"],
+        origin=record["origin"],
+        race=record["race"],
+        character_class=record["character_class"],
+        subclass=record["subclass"],
+        background=record["background"],
+        ability_scores=AbilityScores(**scores),
+        ability_bonuses=dict(bonuses),
+        skills=list(skills),
+        feats=list(feats),
+    ), None
+
+
+# Importing a JSON array or JSON Lines export into storage without loading the file:
+# records are read, validated and checked for id conflicts one batch at a time, and each
+# batch is saved in one transaction. Rejected records are counted in the report (the
+# first max_errors kept in it) and, if error_report is a path, all written there as
+# JSON Lines. With on_conflict="error", a duplicate id raises ValueError; batches before
+# it stay imported.
+def import_characters(
+    storage,
+    path,
+    on_conflict="skip",
+    batch_size=1000,
+    error_report=None,
+    max_errors=100,
+):
+    if on_conflict not in CONFLICT_POLICIES:
+        raise ValueError(
+            f"on_conflict must be one of {', '.join(CONFLICT_POLICIES)}, got {on_conflict!r}"
+        )
+
+    report = ImportReport()
+    with ExitStack() as stack:
+        f = stack.enter_context(open(path, encoding="utf-8-sig"))
+        report_file = None
+        if error_report is not None:
+            report_file = stack.enter_context(open(error_report, "w", encoding="utf-8"))
+
+        def reject(number, char_id, errors):
+            report.invalid += 1
+            issue = ImportIssue(number, char_id, errors)
+            if len(report.errors) < max_errors:
+                report.errors.append(issue)
+            if report_file is not None:
+                report_file.write(json.dumps(issue._asdict(), ensure_ascii=False) + "\n")
+
+        for batch in utils.batched(iter_records(f), batch_size):
+            report.read += len(batch)
+            valid = []
+            for number, record, error in batch:
+                character, errors = (None, [error]) if error else record_to_character(record)
+                if errors:
+                    char_id = record.get("id") if isinstance(record, dict) else None
+                    reject(number, char_id, errors)
+                else:
+                    valid.append((number, character))
+
+            existing = storage.existing_ids(character.id for _, character in valid)
+            to_save = {}
+            for number, character in valid:
+                if character.id in existing or character.id in to_save:
+                    if on_conflict == "skip":
+                        report.skipped += 1
+                        continue
+                    if on_conflict == "error":
+                        raise ValueError(f"Record {number}: duplicate id {character.id}")
+                    if on_conflict == "new_id":
+                        character = character.with_changes(id=str(uuid4()))
+                        report.renamed += 1
+                    else:
+                        report.replaced += 1
+                to_save[character.id] = character
+
+            report.imported += storage.save_characters(to_save.values(), batch_size)
+    return report
@@ -10,8 +10,12 @@ from src.exporters import (
     export_to_html,
 )
 from src import point_buy
+from src import roster_stats
+from src import storage_db
 from src import utils
 
+PAGE_SIZE = 20  # Characters shown per page in listings and selection menus
+
 
 def _pause():
     input("\nPress Enter to continue...")
@@ -162,50 +166,135 @@ def create_manual_character(service, storage):
         storage.save_character(character)
         print("Character saved.")
 
-# Listing all saved characters in the database
+# Paging through saved character summaries with keyset pagination. With select=True the
+# user can pick one by number and its summary is returned; otherwise None is returned
+# when paging stops.
+def _page_through_characters(storage, select, indent=""):
+    page_starts = [None]    # Keyset start of every page seen so far, for going back
+    while True:
+        page = storage.list_summaries(PAGE_SIZE + 1, page_starts[-1])
+        has_next = len(page) > PAGE_SIZE
+        page = page[:PAGE_SIZE]
+        if not page and len(page_starts) == 1:
+            print("No characters saved yet")
+            return None
+
+        first_number = (len(page_starts) - 1) * PAGE_SIZE + 1
+        for i, ch in enumerate(page, start=first_number):
+            print(f"{indent}[{i}] {ch.name} (ID: {ch.id})")
+
+        has_previous = len(page_starts) > 1
+        if not (select or has_next or has_previous):
+            return None
+
+        hints = []
+        if select:
+            hints.append("number to select")
+        if has_next:
+            hints.append("'n' for next page")
+        if has_previous:
+            hints.append("'p' for previous page")
+        hints.append("nothing to " + ("cancel" if select else "stop"))
+
+        while True:
+            raw = input(f"Enter {', '.join(hints)}: ").strip().lower()
+            if not raw:
+                return None
+            if raw == "n" and has_next:
+                page_starts.append(storage_db.page_key(page[-1]))
+                break
+            if raw == "p" and has_previous:
+                page_starts.pop()
+                break
+            if select and raw.isdigit():
+                idx = int(raw) - first_number
+                if 0 <= idx < len(page):
+                    return page[idx]
+                print("Invalid index")
+                continue
+            print("Invalid choice, try again")
+
+# Listing saved characters in the database, one page at a time
 def list_characters(storage):
     print("\n=== Saved Characters ===")
-    characters = storage.load_all_characters()
-    if not characters:
-        print("No characters saved yet.")
-        return
-
-    for i, ch in enumerate(characters, start=1):
-        print(f"[{i}] {ch.name} (ID: {ch.id})")
+    _page_through_characters(storage, select=False)
 
-# User can select a character from the database by number
+# User can select a character from the database by number; only the chosen one is loaded
 def _select_character_from_db(storage):
-    characters = storage.load_all_characters()
-    if not characters:
-        print("No characters saved yet")
+    print("\nSelect a character:")
+    summary = _page_through_characters(storage, select=True, indent="  ")
+    if summary is None:
         return None
+    character = storage.load_character(summary.id)
+    if character is None:
+        print("That character no longer exists")
+    return character
 
-    print("\nSelect a character:")
-    for i, ch in enumerate(characters, start=1):
-        print(f"  [{i}] {ch.name} (ID: {ch.id})")
+# Viewing a saved character from the database
+def view_character(storage):
+    print("\n=== View Character ===")
+    ch = _select_character_from_db(storage)
+    if not ch:
+        print("Cancelled.")
+        return
+
+    print("\n=== Character Sheet ===\n")
+    print(character_to_text(ch))
+
+# Searching saved characters by name, race, class, skills, feats etc. and viewing a result
+def search_characters(storage):
+    print("\n=== Search Characters ===")
+    text = input("Search for (e.g. 'drow wizard arcana'): ").strip()
+    if not text:
+        print("Cancelled.")
+        return
+
+    results = storage.search(text, limit=PAGE_SIZE)
+    if not results:
+        print("No matching characters")
+        return
+
+    for i, ch in enumerate(results, start=1):
+        print(f"  [{i}] {ch.name} - {ch.race} {ch.character_class} (ID: {ch.id})")
 
     while True:
-        raw = input("Enter number (or nothing to cancel): ").strip()
+        raw = input("Enter number to view (or nothing to cancel): ").strip()
         if not raw:
-            return None
+            return
         if not raw.isdigit():
             print("Please enter a number")
             continue
         idx = int(raw)
-        if 1 <= idx <= len(characters):
-            return characters[idx - 1]
+        if 1 <= idx <= len(results):
+            print("\n=== Character Sheet ===\n")
+            print(character_to_text(results[idx - 1]))
+            return
         print("Invalid index")
 
-# Viewing a saved character from the database
-def view_character(storage):
-    print("\n=== View Character ===")
-    ch = _select_character_from_db(storage)
-    if not ch:
-        print("Cancelled.")
+# Showing roster-wide statistics computed in the database
+def show_roster_statistics(storage):
+    print("\n=== Roster Statistics ===")
+    summary = roster_stats.roster_summary(storage)
+    if not summary["characters"]:
+        print("No characters saved yet")
         return
 
-    print("\n=== Character Sheet ===\n")
-    print(character_to_text(ch))
+    print(f"Characters: {summary['characters']}")
+    print("\nAverage ability scores:")
+    for ability, average in summary["average_scores"].items():
+        print(f"  {ability}: {average:.1f}")
+
+    for title, key, top in (
+        ("Classes", "character_class", None),
+        ("Races", "race", None),
+        ("Backgrounds", "background", None),
+        ("Most popular skills", "skills", 5),
+        ("Most popular feats", "feats", 5),
+    ):
+        print(f"\n{title}:")
+        for value, count in summary[key][:top]:
+            share = 100 * count / summary["characters"]
+            print(f"  {value}: {count} ({share:.0f}%)")
 
 # Deleting a saved character from the database
 def delete_character(storage):
@@ -257,45 +346,53 @@ def export_character(storage):
 # Main menu loop for the command-line interface
 def main_menu():
     service = CharacterGenerationService()
-    storage = CharacterStorage()
-
-    while True:
-        print("\n==============================")
-        print("  BG3 Character Creator")
-        print("==============================")
-        print("1) Create a random character")
-        print("2) Create a manual character")
-        print("3) List saved characters")
-        print("4) View saved character")
-        print("5) Export saved character (TXT/JSON/HTML)")
-        print("6) Delete saved character")
-        print("7) Quit")
-
-        choice = input("Choose an option: ").strip()
-
-        if choice == "1":
-            create_random_character(service, storage)
-            _pause()
-        elif choice == "2":
-            create_manual_character(service, storage)
-            _pause()
-        elif choice == "3":
-            list_characters(storage)
-            _pause()
-        elif choice == "4":
-            view_character(storage)
-            _pause()
-        elif choice == "5":
-            export_character(storage)
-            _pause()
-        elif choice == "6":
-            delete_character(storage)
-            _pause()
-        elif choice == "7":
-            print("Goodbye!")
-            break
-        else:
-            print("Unknown option, please try again")
+    # The with block closes the pooled connections however the loop ends (Ctrl+C, errors)
+    with CharacterStorage() as storage:
+        while True:
+            print("\n==============================")
+            print("  BG3 Character Creator")
+            print("==============================")
+            print("1) Create a random character")
+            print("2) Create a manual character")
+            print("3) List saved characters")
+            print("4) View saved character")
+            print("5) Export saved character (TXT/JSON/HTML)")
+            print("6) Delete saved character")
+            print("7) Search saved characters")
+            print("8) Roster statistics")
+            print("9) Quit")
+
+            choice = input("Choose an option: ").strip()
+
+            if choice == "1":
+                create_random_character(service, storage)
+                _pause()
+            elif choice == "2":
+                create_manual_character(service, storage)
+                _pause()
+            elif choice == "3":
+                list_characters(storage)
+                _pause()
+            elif choice == "4":
+                view_character(storage)
+                _pause()
+            elif choice == "5":
+                export_character(storage)
+                _pause()
+            elif choice == "6":
+                delete_character(storage)
+                _pause()
+            elif choice == "7":
+                search_characters(storage)
+                _pause()
+            elif choice == "8":
+                show_roster_statistics(storage)
+                _pause()
+            elif choice == "9":
+                print("Goodbye!")
+                break
+            else:
+                print("Unknown option, please try again")
 
 
 if __name__ == "__main__":
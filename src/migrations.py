@@ -0,0 +1,111 @@
+"""Versioned schema migrations for SQLite; the version lives in PRAGMA user_version."""
+
+from collections import namedtuple
+from contextlib import contextmanager
+
+# A single upgrade step; apply(runner) moves the schema from version - 1 to version
+Migration = namedtuple("Migration", ["version", "description", "apply"])
+
+_PROGRESS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migration_progress (
+    version INTEGER PRIMARY KEY,
+    last_key TEXT,
+    done INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+# Splitting a multi-statement SQL script so it can run inside a transaction
+# (executescript would commit first)
+def execute_script(conn, script):
+    for statement in script.split(";"):
+        if statement.strip():
+            conn.execute(statement)
+
+
+class MigrationRunner:
+    # progress(version, description, done, total) is called after each committed chunk
+    def __init__(self, conn, batch_size=1000, progress=None):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.progress = progress
+        self.migration = None
+
+    @contextmanager
+    def transaction(self):  # One explicit write transaction; DDL included
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+
+    # Applying every migration above the current version, in order, up to target
+    def run(self, migrations, target=None):
+        applied = []
+        for migration in sorted(migrations, key=lambda m: m.version):
+            if migration.version <= schema_version(self.conn):
+                continue
+            if target is not None and migration.version > target:
+                break
+            self.migration = migration
+            migration.apply(self)
+            with self.transaction() as conn:
+                if self._has_progress_table():
+                    conn.execute(
+                        "DELETE FROM schema_migration_progress WHERE version = ?",
+                        (migration.version,),
+                    )
+                conn.execute(f"PRAGMA user_version = {int(migration.version)}")
+            applied.append(migration.version)
+        self.migration = None
+        return applied
+
+    def _has_progress_table(self):
+        return self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+            "AND name = 'schema_migration_progress'"
+        ).fetchone() is not None
+
+    def report(self, done, total):
+        if self.progress is not None:
+            self.progress(self.migration.version, self.migration.description, done, total)
+
+    # Copying rows in key order, committing every batch together with the last key done, so
+    # an interrupted backfill resumes where it stopped. select_sql takes (last key, limit)
+    # and must return rows ordered by their first column; write(conn, rows) stores a batch.
+    def backfill(self, select_sql, write, total=None):
+        version = self.migration.version
+        with self.transaction() as conn:
+            conn.execute(_PROGRESS_TABLE_SQL)
+            conn.execute(
+                "INSERT OR IGNORE INTO schema_migration_progress (version, last_key, done) "
+                "VALUES (?, '', 0)",
+                (version,),
+            )
+        last_key, done = self.conn.execute(
+            "SELECT last_key, done FROM schema_migration_progress WHERE version = ?",
+            (version,),
+        ).fetchone()
+
+        while True:
+            rows = self.conn.execute(select_sql, (last_key, self.batch_size)).fetchall()
+            if not rows:
+                break
+            with self.transaction() as conn:
+                write(conn, rows)
+                last_key = rows[-1][0]
+                done += len(rows)
+                conn.execute(
+                    "UPDATE schema_migration_progress SET last_key = ?, done = ? "
+                    "WHERE version = ?",
+                    (last_key, done, version),
+                )
+            self.report(done, total)
+        return done
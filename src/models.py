@@ -1,35 +1,183 @@
 """Data models for BG3 characters; ability scores and character details."""
 
-from dataclasses import dataclass, asdict, field
+from dataclasses import dataclass
+import operator
 from uuid import uuid4  # For generating unique IDs for characters
 
+from src import data_bg3
+from src.validation import VALIDATOR
+
+
+class _Codes:   # Codes for the known values of a field; they index into a data_bg3 list
+    __slots__ = ("values", "codes")
+
+    def __init__(self, values):
+        self.values = tuple(dict.fromkeys(values))
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    # Returning the int code of a known value, or the value itself wrapped in a 1-tuple.
+    # Unknown values are kept per character instead of being added to the shared table,
+    # which would grow for the life of the process.
+    def encode(self, value):
+        try:
+            code = self.codes.get(value)
+        except TypeError:   # Unhashable, so never a known value
+            code = None
+        return (value,) if code is None else code
+
+
+_ORIGIN_CODES = _Codes(data_bg3.ORIGINS)
+_RACE_CODES = _Codes(data_bg3.RACES)
+_CLASS_CODES = _Codes(data_bg3.CLASSES)
+_SUBCLASS_CODES = _Codes(
+    [sub for subs in data_bg3.SUBCLASSES_BY_CLASS.values() for sub in subs] + ["Base"]
+)
+_BACKGROUND_CODES = _Codes(data_bg3.BACKGROUNDS)
+
+
+# Property storing a categorical field in a slot, as a small integer code when the value is
+# known and as a 1-tuple holding the value otherwise
+def _coded_property(slot, codes):
+    values = codes.values
+
+    def getter(self):
+        code = getattr(self, slot)
+        return values[code] if code.__class__ is int else code[0]
+
+    def setter(self, value):
+        setattr(self, slot, codes.encode(value))
+
+    return property(getter, setter)
+
+
+# Checking that a score fits the byte AbilityScores keeps it in
+def _checked_score(ability, value):
+    try:
+        score = operator.index(value)
+    except TypeError:
+        score = None
+    if score is None or not 0 <= score <= 255:
+        raise ValueError(f"{ability} score must be a whole number from 0 to 255, got {value!r}")
+    return score
 
-@dataclass
-class AbilityScores:    # Ability scores for a character
-    STR: int
-    DEX: int
-    CON: int
-    INT: int
-    WIS: int
-    CHA: int
+
+# Property reading one score out of AbilityScores' bytes; setting rebuilds the six bytes
+def _score_property(index, ability):
+    def getter(self):
+        return self._values[index]  # pylint: disable=protected-access
+
+    def setter(self, value):
+        values = bytearray(self._values)  # pylint: disable=protected-access
+        values[index] = _checked_score(ability, value)
+        self._values = bytes(values)  # pylint: disable=protected-access
+
+    return property(getter, setter)
+
+
+class AbilityScores:    # Ability scores for a character, packed into six bytes (0-255 each)
+    __slots__ = ("_values",)
+    FIELDS = ("STR", "DEX", "CON", "INT", "WIS", "CHA")
+
+    def __init__(self, STR, DEX, CON, INT, WIS, CHA):
+        values = (STR, DEX, CON, INT, WIS, CHA)
+        try:
+            self._values = bytes(values)
+        except (ValueError, TypeError):     # Checking each score to name the bad one
+            self._values = bytes(
+                _checked_score(ability, value) for ability, value in zip(self.FIELDS, values)
+            )
+
+    STR = _score_property(0, "STR")
+    DEX = _score_property(1, "DEX")
+    CON = _score_property(2, "CON")
+    INT = _score_property(3, "INT")
+    WIS = _score_property(4, "WIS")
+    CHA = _score_property(5, "CHA")
 
     def as_dict(self):  # Converting ability scores to a dictionary
-        return asdict(self)
+        return dict(zip(self.FIELDS, self._values))
 
+    def __eq__(self, other):
+        if not isinstance(other, AbilityScores):
+            return NotImplemented
+        return self._values == other._values
 
-@dataclass
-class Character:    # A BG3 character with all relevant data
-    id: str
-    name: str
-    origin: str
-    race: str
-    character_class: str
-    subclass: str
-    background: str
-    ability_scores: AbilityScores
-    ability_bonuses: dict = field(default_factory=dict)
-    skills: list = field(default_factory=list)
-    feats: list = field(default_factory=list)
+    __hash__ = None
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={value}" for name, value in self.as_dict().items())
+        return f"AbilityScores({values})"
+
+    def __reduce__(self):
+        return (AbilityScores, tuple(self._values))
+
+
+class Character:    # A BG3 character with all relevant data; categorical fields are stored as codes
+    __slots__ = (
+        "id",
+        "name",
+        "_origin",
+        "_race",
+        "_character_class",
+        "_subclass",
+        "_background",
+        "ability_scores",
+        "ability_bonuses",
+        "skills",
+        "feats",
+    )
+
+    def __init__(
+        self,
+        id,     # pylint: disable=redefined-builtin
+        name,
+        origin,
+        race,
+        character_class,
+        subclass,
+        background,
+        ability_scores,
+        ability_bonuses=None,
+        skills=None,
+        feats=None,
+    ):
+        self.id = id
+        self.name = name
+        self.origin = origin
+        self.race = race
+        self.character_class = character_class
+        self.subclass = subclass
+        self.background = background
+        self.ability_scores = ability_scores
+        self.ability_bonuses = {} if ability_bonuses is None else ability_bonuses
+        self.skills = [] if skills is None else skills
+        self.feats = [] if feats is None else feats
+
+    origin = _coded_property("_origin", _ORIGIN_CODES)
+    race = _coded_property("_race", _RACE_CODES)
+    character_class = _coded_property("_character_class", _CLASS_CODES)
+    subclass = _coded_property("_subclass", _SUBCLASS_CODES)
+    background = _coded_property("_background", _BACKGROUND_CODES)
+
+    def _fields(self):
+        return tuple(getattr(self, name) for name in _CHARACTER_FIELDS)
+
+    def __eq__(self, other):
+        if not isinstance(other, Character):
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    __hash__ = None
+
+    def __repr__(self):
+        values = ", ".join(
+            f"{name}={value!r}" for name, value in zip(_CHARACTER_FIELDS, self._fields())
+        )
+        return f"Character({values})"
+
+    # Pickling by value, so the integer codes in the slots never end up in a pickle
+    def __reduce__(self):
+        return (Character, self._fields())
 
     @classmethod
     def create_new(
@@ -60,6 +208,29 @@ class Character:    # A BG3 character with all relevant data
             feats=list(feats) if feats else [],
         )
 
+    def with_changes(self, **changes):
+        # Returning an edited copy; only the changed fields are validated. Lists, the bonus
+        # dict and ability scores are copied, so editing the copy never changes this one.
+        unknown = [name for name in changes if name not in _CHARACTER_FIELDS]
+        if unknown:
+            raise TypeError(f"Unknown character field(s): {', '.join(unknown)}")
+
+        errors = VALIDATOR.change_errors(self, changes)
+        if errors:
+            raise ValueError(errors[0])
+
+        edited = Character.__new__(Character)
+        for slot in Character.__slots__:
+            setattr(edited, slot, getattr(self, slot))
+        for name, value in changes.items():
+            setattr(edited, name, value)
+
+        edited.skills = list(edited.skills)
+        edited.feats = list(edited.feats)
+        edited.ability_bonuses = dict(edited.ability_bonuses)
+        edited.ability_scores = AbilityScores(*edited.ability_scores.as_dict().values())
+        return edited
+
     def to_dict(self):
         # Turning this character into a plain dict for JSON / DB
         return {
@@ -93,3 +264,61 @@ class Character:    # A BG3 character with all relevant data
             skills=data.get("skills", []),
             feats=data.get("feats", []),
         )
+
+
+@dataclass
+class CharacterBatch:   # Column-per-field result of bulk generation; rows become Characters lazily
+    ids: list
+    names: list
+    origins: list
+    races: list
+    character_classes: list
+    subclasses: list
+    backgrounds: list
+    base_scores: list   # Tuples in AbilityScores field order, before bonuses
+    plus_two: list
+    plus_one: list
+    skills: list
+    feats: list
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):   # Materializing a single row as a Character
+        plus_two = self.plus_two[index]
+        plus_one = self.plus_one[index]
+        scores = dict(zip(AbilityScores.FIELDS, self.base_scores[index]))
+        scores[plus_two] += 2
+        scores[plus_one] += 1
+        return Character(
+            id=self.ids[index],
+            name=self.names[index],
+            origin=self.origins[index],
+            race=self.races[index],
+            character_class=self.character_classes[index],
+            subclass=self.subclasses[index],
+            background=self.backgrounds[index],
+            ability_scores=AbilityScores(**scores),
+            ability_bonuses={plus_two: 2, plus_one: 1},
+            skills=list(self.skills[index]),
+            feats=list(self.feats[index]),
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+_CHARACTER_FIELDS = (
+    "id",
+    "name",
+    "origin",
+    "race",
+    "character_class",
+    "subclass",
+    "background",
+    "ability_scores",
+    "ability_bonuses",
+    "skills",
+    "feats",
+)
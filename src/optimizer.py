@@ -0,0 +1,130 @@
+"""Point-buy optimizer; best base ability arrays and +2/+1 placements per class or weights."""
+
+from dataclasses import dataclass
+from functools import lru_cache
+import heapq
+from itertools import permutations
+
+from src import data_bg3
+from src import point_buy
+from src.services import apply_ability_bonuses
+
+# How much each ability matters for a class; abilities left out weigh nothing
+CLASS_PROFILES = {
+    "Barbarian": {"STR": 3, "CON": 2, "DEX": 1},
+    "Bard": {"CHA": 3, "DEX": 2, "CON": 1},
+    "Cleric": {"WIS": 3, "CON": 2, "STR": 1},
+    "Druid": {"WIS": 3, "CON": 2, "DEX": 1},
+    "Fighter": {"STR": 3, "CON": 2, "DEX": 1},
+    "Monk": {"DEX": 3, "WIS": 2, "CON": 1},
+    "Paladin": {"STR": 3, "CHA": 2, "CON": 1},
+    "Ranger": {"DEX": 3, "WIS": 2, "CON": 1},
+    "Rogue": {"DEX": 3, "CON": 2, "WIS": 1},
+    "Sorcerer": {"CHA": 3, "CON": 2, "DEX": 1},
+    "Warlock": {"CHA": 3, "CON": 2, "DEX": 1},
+    "Wizard": {"INT": 3, "CON": 2, "DEX": 1},
+}
+
+
+# Standard D&D ability modifier
+def ability_modifier(score):
+    return (score - 10) // 2
+
+
+@dataclass(frozen=True)
+class Build:    # One ranked result; base scores are in data_bg3.ABILITY_SCORES order
+    objective: float
+    base_scores: tuple
+    plus_two: str
+    plus_one: str
+
+    @property
+    def base_scores_dict(self):
+        return dict(zip(data_bg3.ABILITY_SCORES, self.base_scores))
+
+    @property
+    def ability_scores(self):   # Final scores after the +2/+1 bonuses
+        scores, _ = apply_ability_bonuses(self.base_scores_dict, self.plus_two, self.plus_one)
+        return scores
+
+    @property
+    def ability_bonuses(self):
+        return {self.plus_two: 2, self.plus_one: 1}
+
+
+# Top-k base allocations for one +2/+1 placement.
+# Memoized DP over (ability index, remaining budget); each state keeps its k best partial
+# allocations as (objective, raw weighted score, scores) so ties break towards higher scores.
+def _best_allocations(weights, bonuses, total_points, k, objective):
+    scores = sorted(point_buy._COST_TABLE)  # pylint: disable=protected-access
+    costs = point_buy._COST_TABLE  # pylint: disable=protected-access
+    max_cost = max(costs.values())
+    count = len(weights)
+    memo = {}
+
+    def best(index, remaining):
+        if index == count:
+            return [(0, 0, ())] if remaining == 0 else []
+        # Pruning budgets that the remaining abilities can no longer spend exactly
+        if remaining < 0 or remaining > max_cost * (count - index):
+            return []
+        key = (index, remaining)
+        if key in memo:
+            return memo[key]
+
+        candidates = []
+        for score in scores:
+            cost = costs[score]
+            if cost > remaining:
+                break
+            final = score + bonuses[index]
+            value = weights[index] * objective(final)
+            raw = weights[index] * final
+            for rest_value, rest_raw, rest_scores in best(index + 1, remaining - cost):
+                candidates.append((value + rest_value, raw + rest_raw, (score,) + rest_scores))
+
+        memo[key] = heapq.nlargest(k, candidates)
+        return memo[key]
+
+    return best(0, total_points)
+
+
+@lru_cache(maxsize=256)
+def _top_builds(weights, k, total_points, objective):
+    abilities = data_bg3.ABILITY_SCORES
+    ranked = []
+    for plus_two, plus_one in permutations(abilities, 2):
+        bonuses = tuple(
+            2 if ability == plus_two else 1 if ability == plus_one else 0
+            for ability in abilities
+        )
+        for value, raw, scores in _best_allocations(weights, bonuses, total_points, k, objective):
+            ranked.append((value, raw, scores, plus_two, plus_one))
+
+    ranked = heapq.nlargest(k, ranked)
+    return tuple(
+        Build(objective=value, base_scores=scores, plus_two=plus_two, plus_one=plus_one)
+        for value, _, scores, plus_two, plus_one in ranked
+    )
+
+
+# Returning the k best builds for per-ability weights, e.g. {"INT": 3, "CON": 2}.
+# The objective maps a final score to a value and is summed with the weights.
+def top_builds(weights, k=5, total_points=27, objective=ability_modifier):
+    if k < 1:
+        raise ValueError(f"k must be positive, got {k}")
+    for ability in weights:
+        if ability not in data_bg3.ABILITY_SCORES:
+            raise ValueError(f"Unknown ability code: {ability}")
+    weights = tuple(weights.get(ability, 0) for ability in data_bg3.ABILITY_SCORES)
+    builds = _top_builds(weights, k, total_points, objective)
+    if not builds:
+        raise ValueError(f"No valid point-buy allocation costs exactly {total_points}")
+    return list(builds)
+
+
+# Recommended builds for a class using CLASS_PROFILES; results are cached per arguments
+def recommend_for_class(character_class, k=5, total_points=27):
+    if character_class not in CLASS_PROFILES:
+        raise ValueError(f"Invalid class: {character_class}")
+    return top_builds(CLASS_PROFILES[character_class], k=k, total_points=total_points)
@@ -0,0 +1,66 @@
+"""Lazy generator pipeline; generating, filtering, saving and exporting characters in stages."""
+
+from pathlib import Path
+
+from src.exporters import EXPORTERS
+from src import utils
+
+# Every stage takes an iterable of characters and returns a generator of characters.
+# Stages pull from the previous one, so a stage only asks for more once it is done with
+# what it has; at most one batch per stage is held in memory, whatever the run size.
+
+# Source: yielding n random characters (or endlessly if n is None), drawn batch_size at a time
+def generate(service, n=None, name="Tav", batch_size=1000):
+    produced = 0
+    while n is None or produced < n:
+        size = batch_size if n is None else min(batch_size, n - produced)
+        yield from service.random_characters(size, name=name)
+        produced += size
+
+# Stage keeping only the characters for which predicate(character) is true
+def filter_stage(predicate):
+    def stage(characters):
+        return (character for character in characters if predicate(character))
+    return stage
+
+# Stage saving characters to storage in batches, passing them on after each batch is written
+def save_stage(storage, batch_size=500):
+    def stage(characters):
+        for batch in utils.batched(characters, batch_size):
+            storage.save_characters(batch, batch_size=batch_size)
+            yield from batch
+    return stage
+
+# Stage writing each character to out_dir in the given formats ("txt", "json", "html").
+# File names include the character id so characters with the same name don't collide.
+def export_stage(out_dir, formats=("json",)):
+    for export_format in formats:
+        if export_format not in EXPORTERS:
+            raise ValueError(f"Unknown export format: {export_format}")
+
+    def stage(characters):
+        directory = None
+        for character in characters:
+            if directory is None:
+                directory = utils.ensure_directory(out_dir)
+            for export_format in formats:
+                filename = utils.default_export_filename(
+                    f"{character.name}-{character.id}", export_format
+                )
+                EXPORTERS[export_format](character, Path(directory) / filename)
+            yield character
+    return stage
+
+# Chaining stages onto a source; nothing runs until the result is iterated
+def pipeline(source, *stages):
+    stream = iter(source)
+    for stage in stages:
+        stream = stage(stream)
+    return stream
+
+# Running a pipeline to the end and returning how many characters came out of it
+def run(source, *stages):
+    count = 0
+    for _ in pipeline(source, *stages):
+        count += 1
+    return count
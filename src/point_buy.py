@@ -1,6 +1,7 @@
 """27-point point-buy system for ability score generation."""
 
 import random
+from functools import lru_cache
 
 _COST_TABLE = {8: 0, 9: 1, 10: 2, 11: 3, 12: 4, 13: 5, 14: 7, 15: 9}
 
@@ -18,24 +19,122 @@ def total_cost(scores):
 def is_valid_point_buy(scores, total_points=27):
     try:
         cost = total_cost(scores)
-    except ValueError:
+    except (ValueError, TypeError):   # Out of range, or not a score at all
         return False
     return cost == total_points
 
-# Generating random valid point-buy scores
-def random_point_buy(
-    ability_names,
-    total_points=27,
-    rng=None,
-    max_attempts=100000
-    ):
+# Building every valid allocation once per (ability count, budget); tuples in lexicographic order.
+# Branches that can no longer hit the budget exactly are pruned while walking the abilities.
+@lru_cache(maxsize=None)
+def _valid_allocations(ability_count, total_points):
+    scores = sorted(_COST_TABLE)
+    max_cost = max(_COST_TABLE.values())
+    allocations = []
+
+    def walk(prefix, remaining, left):
+        if left == 0:
+            if remaining == 0:
+                allocations.append(tuple(prefix))
+            return
+        for score in scores:
+            cost = _COST_TABLE[score]
+            if cost > remaining:
+                break
+            if remaining - cost > max_cost * (left - 1):
+                continue
+            prefix.append(score)
+            walk(prefix, remaining - cost, left - 1)
+            prefix.pop()
+
+    walk([], total_points, ability_count)
+    return tuple(allocations)
+
+# Returning all valid point-buy allocations as tuples ordered like ability_names
+def valid_allocations(ability_names, total_points=27):
+    return _valid_allocations(len(tuple(ability_names)), total_points)
+
+# Generating random valid point-buy scores; uniform pick from the precomputed table
+def random_point_buy(ability_names, total_points=27, rng=None):
     if rng is None:
         rng = random.Random()
     ability_names = list(ability_names)
 
-    for _ in range(max_attempts):
-        scores = {name: rng.randint(8, 15) for name in ability_names}
-        if is_valid_point_buy(scores, total_points=total_points):
-            return scores
+    allocations = _valid_allocations(len(ability_names), total_points)
+    if not allocations:
+        raise ValueError(f"No valid point-buy allocation costs exactly {total_points}")
+
+    values = allocations[rng.randrange(len(allocations))]
+    return dict(zip(ability_names, values))
+
+# Batch helpers below work on NumPy arrays; NumPy is only imported when they are used
+def _numpy():
+    try:
+        import numpy  # pylint: disable=import-outside-toplevel
+    except ImportError as e:
+        raise RuntimeError("Batch point-buy functions require NumPy (pip install numpy)") from e
+    return numpy
+
+# Cost lookup array indexed by score - 8
+@lru_cache(maxsize=None)
+def _cost_array():
+    np = _numpy()
+    costs = np.array([_COST_TABLE[score] for score in sorted(_COST_TABLE)], dtype=np.int64)
+    costs.setflags(write=False)
+    return costs
+
+@lru_cache(maxsize=None)
+def _allocation_array(ability_count, total_points):
+    np = _numpy()
+    table = np.array(_valid_allocations(ability_count, total_points), dtype=np.int8)
+    table = table.reshape(-1, ability_count)
+    table.setflags(write=False)
+    return table
+
+# Returning a boolean mask of rows whose scores are all inside the cost table
+def _in_range(np, rows):
+    low, high = min(_COST_TABLE), max(_COST_TABLE)
+    return np.all((rows >= low) & (rows <= high), axis=1)
+
+# Scores as int64. Float scores that are not whole numbers (NaN and inf included) become 0,
+# which is out of range, so their rows are invalid rather than truncated into range.
+def _as_rows(np, rows):
+    rows = np.asarray(rows)
+    if rows.ndim != 2:
+        raise ValueError(f"Expected a 2-D array of score rows, got shape {rows.shape}")
+    if rows.dtype.kind == "f":
+        rows = np.where(np.isfinite(rows) & (rows == np.round(rows)), rows, 0)
+    elif rows.dtype.kind not in "iu":
+        raise ValueError(f"Scores must be numbers, got an array of {rows.dtype}")
+    return rows.astype(np.int64, copy=False)
+
+# Total point-buy cost of every row in an (n, abilities) array of scores
+def total_cost_batch(rows):
+    np = _numpy()
+    rows = _as_rows(np, rows)
+    if not np.all(_in_range(np, rows)):
+        raise ValueError("Scores must be between 8 and 15")
+    return _cost_array()[rows - min(_COST_TABLE)].sum(axis=1)
+
+# Boolean array telling which rows are valid point-buys; out-of-range rows are False
+def is_valid_point_buy_batch(rows, total_points=27):
+    np = _numpy()
+    rows = _as_rows(np, rows)
+    in_range = _in_range(np, rows)
+    clipped = np.clip(rows, min(_COST_TABLE), max(_COST_TABLE)) - min(_COST_TABLE)
+    costs = _cost_array()[clipped].sum(axis=1)
+    return in_range & (costs == total_points)
+
+# Generating n random valid point-buys as an (n, ability_count) array.
+# rng can be a numpy Generator, a seed or None.
+def random_point_buy_batch(n, rng=None, ability_count=6, total_points=27):
+    np = _numpy()
+    if n < 0:
+        raise ValueError(f"n must be non-negative, got {n}")
+    if not isinstance(rng, np.random.Generator):
+        rng = np.random.default_rng(rng)
+
+    table = _allocation_array(ability_count, total_points)
+    if len(table) == 0:
+        raise ValueError(f"No valid point-buy allocation costs exactly {total_points}")
 
-    raise RuntimeError("Failed to generate a valid point-buy score")
+    return table[rng.integers(0, len(table), size=n)]
@@ -0,0 +1,222 @@
+"""Roster statistics computed inside SQLite; distributions, average scores and popularity."""
+
+from src.models import AbilityScores
+
+# Character columns that can be counted with distribution()
+CATEGORY_FIELDS = ("origin", "race", "character_class", "subclass", "background")
+
+_SCORE_COLUMNS = [f"{ability.lower()}_score" for ability in AbilityScores.FIELDS]
+
+# Join tables counted by popularity(), as category: (table, column)
+_LIST_FIELDS = {
+    "skill": ("character_skills", "skill"),
+    "feat": ("character_feats", "feat"),
+}
+
+# Optional summary tables, kept up to date by triggers on every write once enabled
+_SUMMARY_TABLES_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS roster_counts (
+        category TEXT NOT NULL,
+        value TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (category, value)
+    ) WITHOUT ROWID
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS roster_totals (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        characters INTEGER NOT NULL,
+        {", ".join(f"{column} INTEGER NOT NULL" for column in _SCORE_COLUMNS)}
+    )
+    """,
+]
+
+
+def _increment(category, value):
+    return (
+        f"INSERT INTO roster_counts (category, value, count) "
+        f"VALUES ('{category}', coalesce({value}, ''), 1) "
+        f"ON CONFLICT(category, value) DO UPDATE SET count = count + 1;"
+    )
+
+
+def _decrement(category, value):
+    return (
+        f"UPDATE roster_counts SET count = count - 1 "
+        f"WHERE category = '{category}' AND value = coalesce({value}, '');"
+    )
+
+
+def _totals(row, sign):
+    sets = ", ".join(f"{column} = {column} {sign} {row}.{column}" for column in _SCORE_COLUMNS)
+    return f"UPDATE roster_totals SET characters = characters {sign} 1, {sets} WHERE id = 1;"
+
+
+def _trigger(name, event, table, body):
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table} BEGIN\n"
+        + "\n".join(body)
+        + "\nEND"
+    )
+
+
+def _summary_triggers():
+    triggers = [
+        _trigger(
+            "roster_stats_insert", "INSERT", "characters",
+            [_increment(field, f"new.{field}") for field in CATEGORY_FIELDS]
+            + [_totals("new", "+")],
+        ),
+        _trigger(
+            "roster_stats_delete", "DELETE", "characters",
+            [_decrement(field, f"old.{field}") for field in CATEGORY_FIELDS]
+            + [_totals("old", "-")],
+        ),
+        _trigger(
+            "roster_stats_update", "UPDATE", "characters",
+            [_decrement(field, f"old.{field}") for field in CATEGORY_FIELDS]
+            + [_increment(field, f"new.{field}") for field in CATEGORY_FIELDS]
+            + [_totals("old", "-"), _totals("new", "+")],
+        ),
+    ]
+    for category, (table, column) in _LIST_FIELDS.items():
+        triggers.append(_trigger(
+            f"roster_stats_{category}_insert", "INSERT", table,
+            [_increment(category, f"new.{column}")],
+        ))
+        triggers.append(_trigger(
+            f"roster_stats_{category}_delete", "DELETE", table,
+            [_decrement(category, f"old.{column}")],
+        ))
+    return triggers
+
+
+def _trigger_names():
+    names = ["roster_stats_insert", "roster_stats_delete", "roster_stats_update"]
+    for category in _LIST_FIELDS:
+        names += [f"roster_stats_{category}_insert", f"roster_stats_{category}_delete"]
+    return names
+
+
+# Creating the summary tables and triggers, filled from the current roster in the same
+# transaction; after this, statistics are read from the summary tables
+def enable_summary_tables(storage):
+    with storage.write_transaction() as conn:
+        for statement in _SUMMARY_TABLES_SQL + _summary_triggers():
+            conn.execute(statement)
+
+        conn.execute("DELETE FROM roster_counts")
+        for field in CATEGORY_FIELDS:
+            conn.execute(
+                f"INSERT INTO roster_counts (category, value, count) "
+                f"SELECT '{field}', coalesce({field}, ''), count(*) FROM characters "
+                f"GROUP BY coalesce({field}, '')"
+            )
+        for category, (table, column) in _LIST_FIELDS.items():
+            conn.execute(
+                f"INSERT INTO roster_counts (category, value, count) "
+                f"SELECT '{category}', {column}, count(*) FROM {table} GROUP BY {column}"
+            )
+
+        conn.execute("DELETE FROM roster_totals")
+        conn.execute(
+            f"INSERT INTO roster_totals (id, characters, {', '.join(_SCORE_COLUMNS)}) "
+            f"SELECT 1, count(*), "
+            f"{', '.join(f'coalesce(sum({column}), 0)' for column in _SCORE_COLUMNS)} "
+            f"FROM characters"
+        )
+
+# Dropping the summary tables and their triggers; statistics go back to GROUP BY queries
+def disable_summary_tables(storage):
+    with storage.write_transaction() as conn:
+        for name in _trigger_names():
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute("DROP TABLE IF EXISTS roster_counts")
+        conn.execute("DROP TABLE IF EXISTS roster_totals")
+
+
+def _has_summary_tables(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'roster_totals'"
+    ).fetchone() is not None
+
+
+def _counts(conn, category, group_sql):
+    if _has_summary_tables(conn):
+        cur = conn.execute(
+            "SELECT value, count FROM roster_counts WHERE category = ? AND count > 0 "
+            "ORDER BY count DESC, value",
+            (category,),
+        )
+    else:
+        cur = conn.execute(group_sql)
+    return cur.fetchall()
+
+
+def _distribution(conn, field):
+    if field not in CATEGORY_FIELDS:
+        raise ValueError(f"Cannot compute a distribution of {field!r}")
+    return _counts(
+        conn,
+        field,
+        f"SELECT coalesce({field}, ''), count(*) AS n FROM characters "
+        f"GROUP BY 1 ORDER BY n DESC, 1",
+    )
+
+
+def _popularity(conn, category):
+    if category not in _LIST_FIELDS:
+        raise ValueError(f"Unknown category: {category!r}")
+    table, column = _LIST_FIELDS[category]
+    return _counts(
+        conn,
+        category,
+        f"SELECT {column}, count(*) AS n FROM {table} GROUP BY 1 ORDER BY n DESC, 1",
+    )
+
+
+def _average_scores(conn):
+    if _has_summary_tables(conn):
+        row = conn.execute(
+            f"SELECT characters, {', '.join(_SCORE_COLUMNS)} FROM roster_totals"
+        ).fetchone()
+        count = row[0]
+        averages = [total / count if count else None for total in row[1:]]
+    else:
+        row = conn.execute(
+            f"SELECT count(*), {', '.join(f'avg({column})' for column in _SCORE_COLUMNS)} "
+            f"FROM characters"
+        ).fetchone()
+        count = row[0]
+        averages = row[1:]
+    return count, dict(zip(AbilityScores.FIELDS, averages))
+
+
+# Returning [(value, count), ...] for a character field, most common first
+def distribution(storage, field):
+    with storage.read_transaction() as conn:
+        return _distribution(conn, field)
+
+# Returning [(skill or feat, count), ...], most common first; category is "skill" or "feat"
+def popularity(storage, category):
+    with storage.read_transaction() as conn:
+        return _popularity(conn, category)
+
+# Returning (character count, {ability: average final score or None})
+def average_scores(storage):
+    with storage.read_transaction() as conn:
+        return _average_scores(conn)
+
+# Everything the CLI statistics screen shows, in one dict; all of it is read in one
+# transaction, so the numbers agree with each other even while other threads write
+def roster_summary(storage):
+    with storage.read_transaction() as conn:
+        count, averages = _average_scores(conn)
+        return {
+            "characters": count,
+            "average_scores": averages,
+            **{field: _distribution(conn, field) for field in CATEGORY_FIELDS},
+            "skills": _popularity(conn, "skill"),
+            "feats": _popularity(conn, "feat"),
+        }
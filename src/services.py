@@ -1,10 +1,18 @@
 """Application logic for BG3 character creation; random and manual generation with validation"""
 
+import os
 import random
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import combinations, permutations
 
 from src import data_bg3
-from src.models import AbilityScores, Character
+from src.models import AbilityScores, Character, CharacterBatch
 from src import point_buy
+from src.validation import VALIDATOR, ValidationResult
 
 # Converting dict to AbilityScores object
 def build_ability_scores_from_dict(scores):
@@ -38,13 +46,119 @@ def apply_ability_bonuses(base_scores, plus_two_ability, plus_one_ability):
 
     return build_ability_scores_from_dict(scores), bonuses
 
+# Lookup tables used by bulk generation, built once on first use
+
+# Every (class, subclass) pair, weighted so each class stays equally likely
+@lru_cache(maxsize=None)
+def _class_subclass_table():
+    pairs = []
+    cum_weights = []
+    total = 0.0
+    for char_class in data_bg3.CLASSES:
+        subclasses = data_bg3.SUBCLASSES_BY_CLASS.get(char_class, ["Base"])
+        for subclass in subclasses:
+            total += 1 / len(subclasses)
+            pairs.append((char_class, subclass))
+            cum_weights.append(total)
+    return tuple(pairs), tuple(cum_weights)
+
+# Every ordered (+2 ability, +1 ability) pair
+@lru_cache(maxsize=None)
+def _bonus_placements():
+    return tuple(permutations(data_bg3.ABILITY_SCORES, 2))
+
+# Every set of 4 skills, in data_bg3 order
+@lru_cache(maxsize=None)
+def _skill_sets():
+    return tuple(combinations(data_bg3.SKILLS, 4))
+
+# Every (base allocation, +2, +1) combination whose final scores meet the given minimums.
+# min_scores is a sorted tuple of (ability, minimum) pairs so results can be cached.
+@lru_cache(maxsize=64)
+def _score_placements(min_scores):
+    abilities = data_bg3.ABILITY_SCORES
+    placements = []
+    for plus_two, plus_one in _bonus_placements():
+        bonus = {plus_two: 2, plus_one: 1}
+        required = [
+            (abilities.index(ability), minimum - bonus.get(ability, 0))
+            for ability, minimum in min_scores
+        ]
+        for allocation in point_buy.valid_allocations(abilities):
+            if all(allocation[i] >= minimum for i, minimum in required):
+                placements.append((allocation, plus_two, plus_one))
+    return tuple(placements)
+
+
+@dataclass
+class GenerationConstraints:    # Restrictions for random_character; None means "any"
+    origin: str = None
+    race: str = None
+    character_class: str = None
+    subclass: str = None
+    background: str = None
+    feat: str = None
+    min_scores: dict = field(default_factory=dict)     # Final scores, after +2/+1 bonuses
+    required_skills: list = field(default_factory=list)
+
+# (class, subclass) pairs allowed by the constraints with their weights from
+# _class_subclass_table; a fixed subclass narrows the classes
+def _class_candidates(character_class, subclass):
+    class_pairs, cum_weights = _class_subclass_table()
+    candidates = []
+    weights = []
+    previous = 0.0
+    for pair, cum_weight in zip(class_pairs, cum_weights):
+        if character_class in (None, pair[0]) and subclass in (None, pair[1]):
+            candidates.append(pair)
+            weights.append(cum_weight - previous)
+        previous = cum_weight
+    if not candidates:
+        raise ValueError(f"No class matches class {character_class!r} and subclass {subclass!r}")
+    return candidates, weights
+
+# Checking every generation constraint without drawing anything. Returns the fixed
+# (value, options, label) fields, class candidates and weights, score placements and the
+# required skills; raises ValueError for the first constraint nothing can satisfy.
+def _constrained_space(constraints):
+    fixed = [
+        (constraints.origin, data_bg3.ORIGINS, "origin"),
+        (constraints.race, data_bg3.RACES, "race"),
+        (constraints.background, data_bg3.BACKGROUNDS, "background"),
+        (constraints.feat, data_bg3.FEATS, "feat"),
+    ]
+    for value, options, label in fixed:
+        if value is not None and value not in options:
+            raise ValueError(f"Invalid {label}: {value}")
+
+    candidates, weights = _class_candidates(constraints.character_class, constraints.subclass)
+
+    for ability in constraints.min_scores:
+        if ability not in data_bg3.ABILITY_SCORES:
+            raise ValueError(f"Unknown ability code: {ability}")
+    placements = _score_placements(tuple(sorted(constraints.min_scores.items())))
+    if not placements:
+        raise ValueError(f"No point-buy allocation reaches {constraints.min_scores}")
+
+    required = list(dict.fromkeys(constraints.required_skills))
+    for skill in required:
+        if skill not in data_bg3.SKILLS:
+            raise ValueError(f"Unknown skill: {skill}")
+    if len(required) > 4:
+        raise ValueError("At most 4 skills can be required")
+    return fixed, candidates, weights, placements, required
+
 # Character-creation logic
 
 class CharacterGenerationService:
     def __init__(self, rng=None):
         self.random = rng or random.Random()
 
-    def random_character(self, name):   # Generating a random character; skills, feats, abilities, etc.
+    # Generating a random character; skills, feats, abilities, etc.
+    def random_character(self, name, constraints=None):
+        if constraints is not None:
+            return self._random_constrained_character(name, constraints)
+
         origin = self.random.choice(data_bg3.ORIGINS)
         race = self.random.choice(data_bg3.RACES)
         char_class = self.random.choice(data_bg3.CLASSES)
@@ -80,6 +194,70 @@ class CharacterGenerationService:
             feats=feats
         )
 
+    # Sampling directly from the constrained space; raises ValueError if nothing matches.
+    # Every constraint is checked before the first draw, so a failing call leaves the RNG
+    # untouched. Unconstrained fields keep the same distribution as in random_character.
+    def _random_constrained_character(self, name, constraints):
+        if isinstance(constraints, dict):
+            constraints = GenerationConstraints(**constraints)
+        fixed, candidates, weights, placements, required = _constrained_space(constraints)
+        rng = self.random
+
+        # Drawing, in the same order as before so seeded results don't change
+        origin, race, background, feat = (
+            rng.choice(options) if value is None else value for value, options, _ in fixed
+        )
+        char_class, subclass = rng.choices(candidates, weights=weights)[0]
+
+        allocation, plus_two, plus_one = placements[rng.randrange(len(placements))]
+        base_scores = dict(zip(data_bg3.ABILITY_SCORES, allocation))
+        ability_scores, ability_bonuses = apply_ability_bonuses(base_scores, plus_two, plus_one)
+
+        others = [skill for skill in data_bg3.SKILLS if skill not in required]
+        skills = rng.sample(required + rng.sample(others, 4 - len(required)), 4)
+
+        return Character.create_new(
+            name=name,
+            origin=origin,
+            race=race,
+            character_class=char_class,
+            subclass=subclass,
+            background=background,
+            ability_scores=ability_scores,
+            ability_bonuses=ability_bonuses,
+            skills=skills,
+            feats=[feat]
+        )
+
+    # Generating n random characters with one RNG call per field instead of per character.
+    # Returns a CharacterBatch; iterate it (or index it) to get Character objects lazily.
+    def random_characters(self, n, name="Tav"):
+        if n < 0:
+            raise ValueError(f"n must be non-negative, got {n}")
+        rng = self.random
+
+        class_pairs, class_weights = _class_subclass_table()
+        classes = rng.choices(class_pairs, cum_weights=class_weights, k=n)
+        bonuses = rng.choices(_bonus_placements(), k=n)
+
+        # UUIDs come from the seeded RNG so a seed reproduces the ids too
+        getrandbits = rng.getrandbits
+        ids = [str(uuid.UUID(int=getrandbits(128), version=4)) for _ in range(n)]
+
+        return CharacterBatch(
+            ids=ids,
+            names=[name] * n,
+            origins=rng.choices(data_bg3.ORIGINS, k=n),
+            races=rng.choices(data_bg3.RACES, k=n),
+            character_classes=[pair[0] for pair in classes],
+            subclasses=[pair[1] for pair in classes],
+            backgrounds=rng.choices(data_bg3.BACKGROUNDS, k=n),
+            base_scores=rng.choices(point_buy.valid_allocations(data_bg3.ABILITY_SCORES), k=n),
+            plus_two=[pair[0] for pair in bonuses],
+            plus_one=[pair[1] for pair in bonuses],
+            skills=rng.choices(_skill_sets(), k=n),
+            feats=[(feat,) for feat in rng.choices(data_bg3.FEATS, k=n)],
+        )
 
     def build_character_from_choices(
         self,
@@ -96,69 +274,121 @@ class CharacterGenerationService:
         feats=None
     ):  # Manual creation from user choices
 
-        # Basic validation of string choices
-        if origin not in data_bg3.ORIGINS:
-            raise ValueError(f"Invalid origin: {origin}")
-        if race not in data_bg3.RACES:
-            raise ValueError(f"Invalid race: {race}")
-        if character_class not in data_bg3.CLASSES:
-            raise ValueError(f"Invalid class: {character_class}")
-
-        valid_subclasses = data_bg3.SUBCLASSES_BY_CLASS.get(character_class, [])
-        if valid_subclasses and subclass not in valid_subclasses:
-            raise ValueError(f"Invalid subclass {subclass!r} for class {character_class!r}")
+        choices = {
+            "name": name,
+            "origin": origin,
+            "race": race,
+            "character_class": character_class,
+            "subclass": subclass,
+            "background": background,
+            "base_scores": base_scores,
+            "plus_two_ability": plus_two_ability,
+            "plus_one_ability": plus_one_ability,
+            "skills": skills,
+            "feats": feats,
+        }
+        errors = VALIDATOR.errors(choices)
+        if errors:
+            raise ValueError(errors[0])
+        return self._character_from_valid_choices(choices)
+
+    # Validating many choice dicts in one pass; yields a ValidationResult per record with
+    # every error found. Only records without errors get a Character.
+    def validate_many(self, choices_iterable):
+        for index, choices in enumerate(choices_iterable):
+            errors = VALIDATOR.errors(choices)
+            if errors:
+                yield ValidationResult(index=index, errors=errors)
+            else:
+                character = self._character_from_valid_choices(choices)
+                yield ValidationResult(index=index, character=character)
+
+    # Building a character from choices that already passed validation
+    def _character_from_valid_choices(self, choices):
+        ability_scores, ability_bonuses = apply_ability_bonuses(
+            choices["base_scores"],
+            choices["plus_two_ability"],
+            choices["plus_one_ability"]
+        )
+        return Character.create_new(
+            name=choices["name"],
+            origin=choices["origin"],
+            race=choices["race"],
+            character_class=choices["character_class"],
+            subclass=choices["subclass"],
+            background=choices["background"],
+            ability_scores=ability_scores,
+            ability_bonuses=ability_bonuses,
+            skills=choices["skills"],
+            feats=choices.get("feats") or []
+        )
 
-        if background not in data_bg3.BACKGROUNDS:
-            raise ValueError(f"Invalid background: {background}")
+    # Edits below return a new character through Character.with_changes
 
-        # Validating base scores with point-buy rules
-        if set(base_scores.keys()) != set(data_bg3.ABILITY_SCORES):
-            raise ValueError("Base scores must include all abilities: " + ", ".join(data_bg3.ABILITY_SCORES))
+    # Returning a copy of character with new skills
+    def with_new_skills(self, character, skills):
+        return character.with_changes(skills=skills)
 
-        if not point_buy.is_valid_point_buy(base_scores):
-            raise ValueError("Ability scores do not satisfy 27-point point-buy rules")
+    # Returning a copy of character with new feats
+    def with_new_feats(self, character, feats):
+        return character.with_changes(feats=feats)
 
-        # Applying +2/+1 bonuses
+    # Returning a copy of character with new base scores and +2/+1 bonuses
+    def respec(self, character, base_scores, plus_two_ability, plus_one_ability):
+        errors = VALIDATOR.score_errors(base_scores, plus_two_ability, plus_one_ability)
+        if errors:
+            raise ValueError(errors[0])
         ability_scores, ability_bonuses = apply_ability_bonuses(
             base_scores,
             plus_two_ability,
             plus_one_ability
         )
-
-        # Validating skills; exactly 4 and all must be valid
-        if len(skills) != 4:
-            raise ValueError("You must select 4 skills")
-        for skill in skills:
-            if skill not in data_bg3.SKILLS:
-                raise ValueError(f"Unknown skill: {skill}")
-
-        # Validating feats
-        feats = feats or []
-        for feat in feats:
-            if feat not in data_bg3.FEATS:
-                raise ValueError(f"Unknown feat: {feat}")
-
-        return Character.create_new(
-            name=name,
-            origin=origin,
-            race=race,
-            character_class=character_class,
-            subclass=subclass,
-            background=background,
+        return character.with_changes(
             ability_scores=ability_scores,
-            ability_bonuses=ability_bonuses,
-            skills=skills,
-            feats=feats
+            ability_bonuses=ability_bonuses
         )
 
-# Returning a copy of character with new skills
-    def with_new_skills(self, character, skills):
-        if len(skills) != 4:
-            raise ValueError("You must select 4 skills")
-        for skill in skills:
-            if skill not in data_bg3.SKILLS:
-                raise ValueError(f"Unknown skill: {skill}")
-
-        new_data = character.to_dict()
-        new_data["skills"] = list(skills)
-        return Character.from_dict(new_data)
+# Parallel generation
+
+# Worker entry point; chunk i always gets the same RNG stream, whichever process runs it
+def _generate_chunk(seed, chunk_index, size, name):
+    rng = random.Random(f"{seed}:{chunk_index}")
+    return CharacterGenerationService(rng).random_characters(size, name=name)
+
+# Yielding CharacterBatch chunks in order. Output depends only on n, seed and chunk_size,
+# never on the number of workers. At most two chunks per worker are in flight at once.
+def generate_parallel_batches(n, workers=None, seed=None, chunk_size=10000, name="Tav"):
+    if n < 0:
+        raise ValueError(f"n must be non-negative, got {n}")
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)
+    workers = workers or os.cpu_count() or 1
+
+    chunks = (
+        (index, min(chunk_size, n - start))
+        for index, start in enumerate(range(0, n, chunk_size))
+    )
+
+    if workers == 1:
+        for index, size in chunks:
+            yield _generate_chunk(seed, index, size, name)
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending = deque()
+        for index, size in chunks:
+            pending.append(pool.submit(_generate_chunk, seed, index, size, name))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+# Same as generate_parallel_batches, but yielding Character objects one by one
+def generate_parallel(n, workers=None, seed=None, chunk_size=10000, name="Tav"):
+    for batch in generate_parallel_batches(n, workers, seed, chunk_size, name):
+        yield from batch
@@ -0,0 +1,188 @@
+"""Asyncio wrapper for CharacterStorage; blocking SQLite work runs on a dedicated executor."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+
+from src.storage_db import CharacterStorage
+
+
+class AsyncCharacterStorage:
+    # Every executor thread keeps its own pooled connection (thread affinity).
+    # Writes issued while others are in flight are queued and applied together in order,
+    # consecutive saves and deletes as one batched transaction each. Identical reads running
+    # at the same time share one query and get the same result objects.
+    # An in-memory database has a single connection, so it gets a single worker thread.
+    def __init__(self, db_path="bg3_characters.db", workers=4, **storage_options):
+        if str(db_path) == ":memory:":
+            workers = 1
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="bg3-storage"
+        )
+        self._storage_args = (db_path, workers, storage_options)
+        self._storage = None
+        self._open_lock = asyncio.Lock()
+        self._pending_writes = []
+        self._flush_task = None
+        self._inflight_reads = {}
+
+    # Creating and opening an async storage without blocking the event loop
+    @classmethod
+    async def open(cls, db_path="bg3_characters.db", workers=4, **storage_options):
+        storage = cls(db_path, workers, **storage_options)
+        await storage._ensure_storage()
+        return storage
+
+    async def _ensure_storage(self):
+        async with self._open_lock:
+            if self._storage is None:
+                db_path, workers, options = self._storage_args
+                # One spare connection in case the opening thread is not a worker
+                self._storage = await self._run(
+                    CharacterStorage,
+                    db_path,
+                    pool_size=workers + 1,
+                    thread_affinity=True,
+                    **options,
+                )
+        return self._storage
+
+    def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+    async def close(self):
+        await self._drain_writes()
+        if self._storage is not None:
+            await self._run(self._storage.close)
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        await self._ensure_storage()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    # Reads
+
+    # Sharing one executor call between identical concurrent reads
+    async def _read(self, method, *args):
+        storage = await self._ensure_storage()
+        key = (method, args)
+        try:
+            future = self._inflight_reads.get(key)
+        except TypeError:   # Unhashable arguments, no de-duplication
+            return await self._run(getattr(storage, method), *args)
+
+        if future is None:
+            future = asyncio.ensure_future(self._run(getattr(storage, method), *args))
+            self._inflight_reads[key] = future
+            future.add_done_callback(lambda _: self._forget_read(key, future))
+        return await asyncio.shield(future)
+
+    def _forget_read(self, key, future):
+        if self._inflight_reads.get(key) is future:
+            del self._inflight_reads[key]
+
+    async def load_character(self, char_id):
+        return await self._read("load_character", char_id)
+
+    async def load_all_characters(self):
+        return await self._read("load_all_characters")
+
+    async def list_summaries(self, page_size=None, after=None):
+        return await self._read("list_summaries", page_size, after)
+
+    async def characters_page(self, page_size=50, after=None):
+        return await self._read("characters_page", page_size, after)
+
+    async def search(self, text, limit=20):
+        return await self._read("search", text, limit)
+
+    async def query(self, **filters):
+        storage = await self._ensure_storage()
+        return await self._run(storage.query, **filters)
+
+    # Writes
+
+    async def save_character(self, character):
+        await self._write("save", character)
+
+    async def save_characters(self, characters, batch_size=1000):
+        return await self._write("save_many", (list(characters), batch_size))
+
+    async def delete_character(self, char_id):
+        await self._write("delete", char_id)
+
+    async def delete_characters(self, char_ids, batch_size=1000):
+        return await self._write("delete_many", (list(char_ids), batch_size))
+
+    async def _write(self, kind, payload):
+        await self._ensure_storage()
+        future = asyncio.get_running_loop().create_future()
+        self._pending_writes.append((kind, payload, future))
+        if self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush())
+        return await future
+
+    async def _drain_writes(self):
+        if self._flush_task is not None:
+            await asyncio.shield(self._flush_task)
+
+    async def _flush(self):
+        try:
+            await asyncio.sleep(0)  # Letting writes issued in the same loop turn queue up
+            while self._pending_writes:
+                ops, self._pending_writes = self._pending_writes, []
+                results = await self._run(self._apply_writes, ops)
+                # Reads that started before these writes must not be shared with new callers
+                self._inflight_reads.clear()
+                for (_, _, future), (result, error) in zip(ops, results):
+                    if future.done():
+                        continue
+                    if error is not None:
+                        future.set_exception(error)
+                    else:
+                        future.set_result(result)
+        finally:
+            self._flush_task = None
+
+    # Runs on the executor; consecutive single saves/deletes become one bulk call each.
+    # Returns (result, error) per op, so one failed write doesn't fail the others.
+    def _apply_writes(self, ops):
+        results = []
+        for kind, group in groupby(ops, key=lambda op: op[0]):
+            payloads = [payload for _, payload, _ in group]
+            if kind in ("save", "delete"):
+                results.extend(self._apply_merged(kind, payloads))
+            else:
+                results.extend(self._apply_one(kind, payload) for payload in payloads)
+        return results
+
+    # One bulk call for merged single writes (the last save of an id wins, as it would one
+    # by one); if it fails, each write is retried alone so only the bad ones get an error
+    def _apply_merged(self, kind, payloads):
+        storage = self._storage
+        if len(payloads) > 1:
+            bulk = storage.save_characters if kind == "save" else storage.delete_characters
+            try:
+                bulk(payloads)
+                return [(None, None)] * len(payloads)
+            except Exception:   # pylint: disable=broad-exception-caught
+                pass
+        return [self._apply_one(kind, payload) for payload in payloads]
+
+    def _apply_one(self, kind, payload):
+        storage = self._storage
+        try:
+            if kind == "save":
+                return storage.save_character(payload), None
+            if kind == "delete":
+                return storage.delete_character(payload), None
+            items, batch_size = payload
+            if kind == "save_many":
+                return storage.save_characters(items, batch_size), None
+            return storage.delete_characters(items, batch_size), None
+        except Exception as error:   # pylint: disable=broad-exception-caught
+            return None, error
@@ -2,151 +2,738 @@
 
 import sqlite3
 import json
+import queue
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
 
-from src.models import Character
+from src.models import AbilityScores, Character
+from src import migrations
+from src import utils
+
+# Pragmas applied to every pooled connection; can be overridden per storage
+DEFAULT_PRAGMAS = {
+    "synchronous": "NORMAL",    # With WAL, fsync only at checkpoints; still safe after a crash
+    "cache_size": -16000,       # Negative means KiB, so ~16 MB of page cache per connection
+    "mmap_size": 268435456,     # Memory-map up to 256 MB of the database file
+    "busy_timeout": 5000,       # Waiting for locks (ms) instead of failing right away
+}
+
+
+_ABILITIES = AbilityScores.FIELDS
+_SCORE_COLUMNS = [f"{ability.lower()}_score" for ability in _ABILITIES]
+_BONUS_COLUMNS = [f"{ability.lower()}_bonus" for ability in _ABILITIES]
+_CHARACTER_COLUMNS = [
+    "id", "name", "origin", "race", "character_class", "subclass", "background",
+] + _SCORE_COLUMNS + _BONUS_COLUMNS
+
+# Normalized schema: one integer column per score and bonus, skills and feats in join tables
+_SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS characters (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    origin TEXT,
+    race TEXT,
+    character_class TEXT,
+    subclass TEXT,
+    background TEXT,
+    {", ".join(f"{column} INTEGER NOT NULL" for column in _SCORE_COLUMNS)},
+    {", ".join(f"{column} INTEGER NOT NULL DEFAULT 0" for column in _BONUS_COLUMNS)}
+);
+CREATE TABLE IF NOT EXISTS character_skills (
+    character_id TEXT NOT NULL REFERENCES characters(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    skill TEXT NOT NULL,
+    PRIMARY KEY (character_id, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS character_feats (
+    character_id TEXT NOT NULL REFERENCES characters(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    feat TEXT NOT NULL,
+    PRIMARY KEY (character_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_characters_name ON characters(name COLLATE NOCASE, id);
+CREATE INDEX IF NOT EXISTS idx_characters_race ON characters(race);
+CREATE INDEX IF NOT EXISTS idx_characters_class ON characters(character_class, subclass);
+CREATE INDEX IF NOT EXISTS idx_characters_background ON characters(background);
+CREATE INDEX IF NOT EXISTS idx_character_skills_skill ON character_skills(skill, character_id);
+CREATE INDEX IF NOT EXISTS idx_character_feats_feat ON character_feats(feat, character_id);
+"""
+
+_UPSERT_SQL = f"""
+    INSERT INTO characters ({", ".join(_CHARACTER_COLUMNS)})
+    VALUES ({", ".join("?" for _ in _CHARACTER_COLUMNS)})
+    ON CONFLICT(id) DO UPDATE SET
+    {", ".join(f"{column} = excluded.{column}" for column in _CHARACTER_COLUMNS[1:])}
+"""
+
+# Skills and feats come back as JSON arrays built in SQL, in their saved order
+_SELECT_SQL = f"""
+    SELECT {", ".join(f"c.{column}" for column in _CHARACTER_COLUMNS)},
+        (SELECT json_group_array(skill) FROM (
+            SELECT skill FROM character_skills WHERE character_id = c.id ORDER BY position
+        )),
+        (SELECT json_group_array(feat) FROM (
+            SELECT feat FROM character_feats WHERE character_id = c.id ORDER BY position
+        ))
+    FROM characters AS c
+"""
+
+# Columns query() can sort by
+_ORDER_COLUMNS = {
+    "name": "c.name COLLATE NOCASE",
+    "origin": "c.origin",
+    "race": "c.race",
+    "character_class": "c.character_class",
+    "subclass": "c.subclass",
+    "background": "c.background",
+    **{ability: f"c.{column}" for ability, column in zip(_ABILITIES, _SCORE_COLUMNS)},
+}
+
+
+# Turning a character into a characters row plus its skill and feat rows
+def _character_rows(character):
+    scores = character.ability_scores.as_dict()
+    bonuses = character.ability_bonuses
+    row = (
+        character.id,
+        character.name,
+        character.origin,
+        character.race,
+        character.character_class,
+        character.subclass,
+        character.background,
+        *(scores[ability] for ability in _ABILITIES),
+        *(bonuses.get(ability, 0) for ability in _ABILITIES),
+    )
+    skills = [(character.id, i, skill) for i, skill in enumerate(character.skills)]
+    feats = [(character.id, i, feat) for i, feat in enumerate(character.feats)]
+    return row, skills, feats
+
+# Building a character from a _SELECT_SQL row
+def _row_to_character(row):
+    count = len(_ABILITIES)
+    scores = row[7:7 + count]
+    bonuses = row[7 + count:7 + 2 * count]
+    return Character(
+        id=row[0],
+        name=row[1],
+        origin=row[2],
+        race=row[3],
+        character_class=row[4],
+        subclass=row[5],
+        background=row[6],
+        ability_scores=AbilityScores(*scores),
+        ability_bonuses={
+            ability: bonus for ability, bonus in zip(_ABILITIES, bonuses) if bonus
+        },
+        skills=json.loads(row[-2]),
+        feats=json.loads(row[-1]),
+    )
+
+# Returning which of ids are already in characters; the ids go in as one JSON parameter,
+# so batches aren't bound by SQLite's limit on query parameters
+def _stored_ids(conn, ids):
+    rows = conn.execute(
+        "SELECT id FROM characters WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps(ids),),
+    )
+    return {row[0] for row in rows}
+
+# Writing rows from _character_rows; existing characters get their skills and feats replaced.
+# Skills and feats go in before the character rows (foreign keys are checked at commit),
+# so triggers on characters can read them. Only ids already stored have old child rows to
+# delete, so new characters skip those deletes. An id repeated in rows is written once,
+# with its last row, as repeated INSERT OR REPLACE statements used to leave it.
+def _write_characters(conn, rows):
+    rows = list({row[0]: (row, skills, feats) for row, skills, feats in rows}.values())
+    existing = [(char_id,) for char_id in _stored_ids(conn, [row[0] for row, _, _ in rows])]
+    # After the SELECT: outside a transaction it ends its own, which resets this pragma
+    conn.execute("PRAGMA defer_foreign_keys = ON")
+    if existing:
+        conn.executemany("DELETE FROM character_skills WHERE character_id = ?", existing)
+        conn.executemany("DELETE FROM character_feats WHERE character_id = ?", existing)
+    conn.executemany(
+        "INSERT INTO character_skills (character_id, position, skill) VALUES (?, ?, ?)",
+        [skill for _, skills, _ in rows for skill in skills],
+    )
+    conn.executemany(
+        "INSERT INTO character_feats (character_id, position, feat) VALUES (?, ?, ?)",
+        [feat for _, _, feats in rows for feat in feats],
+    )
+    conn.executemany(_UPSERT_SQL, [row for row, _, _ in rows])
+
+# Accepting a single value or a collection of values for an equality filter
+def _in_clause(column, value, params):
+    if isinstance(value, (list, tuple, set, frozenset)):
+        values = list(value)
+        params.extend(values)
+        return f"{column} IN ({', '.join('?' for _ in values)})"
+    params.append(value)
+    return f"{column} = ?"
+
+
+# What CharacterStorage.query() filters on; unset fields match everything.
+# Categorical filters take one value or a list of allowed values; min_scores and
+# max_scores map ability codes to final scores; skills and feats must all be present.
+@dataclass(frozen=True)
+class CharacterFilters:     # pylint: disable=too-many-instance-attributes
+    origin: object = None
+    race: object = None
+    character_class: object = None
+    subclass: object = None
+    background: object = None
+    name: str = None
+    min_scores: dict = None
+    max_scores: dict = None
+    skills: list = None
+    feats: list = None
+
+# Turning CharacterFilters into WHERE conditions on characters AS c, adding their params
+def _filter_conditions(filters, params):
+    conditions = []
+    for column in ("origin", "race", "character_class", "subclass", "background"):
+        value = getattr(filters, column)
+        if value is not None:
+            conditions.append(_in_clause(f"c.{column}", value, params))
+    if filters.name is not None:
+        conditions.append("c.name = ? COLLATE NOCASE")
+        params.append(filters.name)
+
+    for bounds, operator in ((filters.min_scores, ">="), (filters.max_scores, "<=")):
+        for ability, value in (bounds or {}).items():
+            if ability not in _ABILITIES:
+                raise ValueError(f"Unknown ability code: {ability}")
+            column = _SCORE_COLUMNS[_ABILITIES.index(ability)]
+            conditions.append(f"c.{column} {operator} ?")
+            params.append(value)
+
+    for skill in filters.skills or []:
+        conditions.append(
+            "EXISTS (SELECT 1 FROM character_skills AS s "
+            "WHERE s.character_id = c.id AND s.skill = ?)"
+        )
+        params.append(skill)
+    for feat in filters.feats or []:
+        conditions.append(
+            "EXISTS (SELECT 1 FROM character_feats AS f "
+            "WHERE f.character_id = c.id AND f.feat = ?)"
+        )
+        params.append(feat)
+    return conditions
+
+
+# Row of list_summaries; just what listings and selection menus show
+CharacterSummary = namedtuple("CharacterSummary", ["id", "name"])
+
+# Keyset pagination key of a character (or anything with name and id)
+def page_key(character):
+    return (character.name, character.id)
+
+
+# Schema migrations; user_version 0 is either an empty database or the original
+# layout with JSON text columns
+
+# Version 1: normalized schema. An old JSON-column table is renamed to characters_json and
+# copied over in committed chunks, so readers are never locked out for long and an
+# interrupted upgrade resumes from the last chunk. Rows written by newer code during the
+# copy win over the old ones.
+def _migrate_normalized_schema(runner):
+    with runner.transaction() as conn:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(characters)")}
+        if "ability_scores" in columns:
+            conn.execute("ALTER TABLE characters RENAME TO characters_json")
+        migrations.execute_script(conn, _SCHEMA_SQL)
+
+    has_json_table = runner.conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'characters_json'"
+    ).fetchone()
+    if not has_json_table:
+        return
+
+    def write(conn, rows):
+        existing = _stored_ids(conn, [row[0] for row in rows])
+        characters = []
+        for row in rows:
+            if row[0] in existing:
+                continue
+            try:
+                characters.append(Character.from_dict({
+                    "id": row[0],
+                    "name": row[1],
+                    "origin": row[2],
+                    "race": row[3],
+                    "character_class": row[4],
+                    "subclass": row[5],
+                    "background": row[6],
+                    "ability_scores": json.loads(row[7]),
+                    "ability_bonuses": json.loads(row[8]),
+                    "skills": json.loads(row[9]),
+                    "feats": json.loads(row[10])
+                }))
+            except (ValueError, TypeError) as error:
+                raise ValueError(f"Cannot migrate character {row[0]!r}: {error}") from error
+        _write_characters(conn, [_character_rows(character) for character in characters])
+
+    total = runner.conn.execute("SELECT count(*) FROM characters_json").fetchone()[0]
+    runner.backfill(
+        "SELECT id, name, origin, race, character_class, subclass, background, "
+        "ability_scores, ability_bonuses, skills, feats FROM characters_json "
+        "WHERE id > ? ORDER BY id LIMIT ?",
+        write,
+        total=total,
+    )
+    with runner.transaction() as conn:
+        conn.execute("DROP TABLE characters_json")
+
+
+# Full-text index over the searchable text of each character, keyed by characters.rowid
+# (saves are upserts, so a character keeps its rowid). Triggers on characters keep it in
+# sync; _write_characters stores skills and feats before the character row, so the
+# insert/update triggers already see them and each save costs one index write.
+_FTS_SKILLS_SQL = (
+    "coalesce((SELECT group_concat(skill, ' ') FROM character_skills "
+    "WHERE character_id = new.id), '')"
+)
+_FTS_FEATS_SQL = (
+    "coalesce((SELECT group_concat(feat, ' ') FROM character_feats "
+    "WHERE character_id = new.id), '')"
+)
+_FTS_SQL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS characters_fts USING fts5(
+    name, origin, race, character_class, subclass, background, skills, feats,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS characters_fts_insert AFTER INSERT ON characters BEGIN
+    INSERT INTO characters_fts (
+        rowid, name, origin, race, character_class, subclass, background, skills, feats
+    ) VALUES (
+        new.rowid, new.name, new.origin, new.race, new.character_class, new.subclass,
+        new.background, {_FTS_SKILLS_SQL}, {_FTS_FEATS_SQL}
+    );
+END;
+CREATE TRIGGER IF NOT EXISTS characters_fts_update AFTER UPDATE ON characters BEGIN
+    UPDATE characters_fts SET
+        name = new.name, origin = new.origin, race = new.race,
+        character_class = new.character_class, subclass = new.subclass,
+        background = new.background, skills = {_FTS_SKILLS_SQL}, feats = {_FTS_FEATS_SQL}
+    WHERE rowid = new.rowid;
+END;
+CREATE TRIGGER IF NOT EXISTS characters_fts_delete AFTER DELETE ON characters BEGIN
+    DELETE FROM characters_fts WHERE rowid = old.rowid;
+END;
+"""
+
+# Version 2: FTS5 search index. Triggers go in first so rows saved during the backfill
+# are indexed by them; the backfill skips rows that are already in the index.
+def _migrate_full_text_search(runner):
+    with runner.transaction() as conn:
+        _execute_trigger_script(conn, _FTS_SQL)
+
+    def write(conn, rows):
+        # Rowids go in as one JSON parameter, as in _stored_ids
+        indexed = {
+            row[0] for row in conn.execute(
+                "SELECT rowid FROM characters_fts WHERE rowid IN (SELECT value FROM json_each(?))",
+                (json.dumps([row[1] for row in rows]),),
+            )
+        }
+        conn.executemany(
+            "INSERT INTO characters_fts (rowid, name, origin, race, character_class, "
+            "subclass, background, skills, feats) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [row[1:] for row in rows if row[1] not in indexed],
+        )
+
+    total = runner.conn.execute("SELECT count(*) FROM characters").fetchone()[0]
+    runner.backfill(
+        "SELECT c.id, c.rowid, c.name, c.origin, c.race, c.character_class, c.subclass, "
+        "c.background, "
+        "coalesce((SELECT group_concat(skill, ' ') FROM character_skills "
+        "WHERE character_id = c.id), ''), "
+        "coalesce((SELECT group_concat(feat, ' ') FROM character_feats "
+        "WHERE character_id = c.id), '') "
+        "FROM characters AS c WHERE c.id > ? ORDER BY c.id LIMIT ?",
+        write,
+        total=total,
+    )
+
+# Trigger bodies contain semicolons, so the script is split on "END;" boundaries instead
+def _execute_trigger_script(conn, script):
+    for part in script.split("END;"):
+        if not part.strip():
+            continue
+        if "CREATE TRIGGER" in part:
+            head, trigger = part.split("CREATE TRIGGER", 1)
+            migrations.execute_script(conn, head)
+            conn.execute("CREATE TRIGGER" + trigger + "END;")
+        else:
+            migrations.execute_script(conn, part)
+
+
+MIGRATIONS = [
+    migrations.Migration(1, "Normalized schema", _migrate_normalized_schema),
+    migrations.Migration(2, "Full-text search index", _migrate_full_text_search),
+]
+
+
+class _ConnectionPool:  # Small thread-safe pool of long-lived SQLite connections
+    # With thread_affinity, a thread keeps the first connection it gets and never returns it,
+    # so there must be no more threads using the pool than connections in it.
+    # Waiting for a free connection gives up after timeout seconds, or right away when the
+    # waiting thread itself holds every connection (a storage call nested in a transaction).
+    def __init__(self, factory, size, thread_affinity=False, timeout=30.0):
+        self._factory = factory
+        self._size = size
+        self._thread_affinity = thread_affinity
+        self._timeout = timeout
+        self._pinned = threading.local()
+        self._held = threading.local()  # Connections borrowed and not yet released, per thread
+        self._idle = queue.LifoQueue()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self):  # Reusing an idle connection, opening a new one, or waiting for one
+        if self._closed:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed storage")
+        if self._thread_affinity:
+            conn = getattr(self._pinned, "conn", None)
+            if conn is None:
+                conn = self._pinned.conn = self._take()
+            return conn
+        conn = self._take()
+        self._held.count = getattr(self._held, "count", 0) + 1
+        return conn
+
+    def _take(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._connections) < self._size:
+                conn = self._factory()
+                self._connections.append(conn)
+                return conn
+        if getattr(self._held, "count", 0) >= self._size:
+            raise sqlite3.ProgrammingError(
+                "This thread already holds every pooled connection; storage calls cannot be "
+                "nested inside a transaction"
+            )
+
+        # Waking up now and then, so threads waiting here notice close()
+        deadline = time.monotonic() + self._timeout
+        while not self._closed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise sqlite3.OperationalError(
+                    f"No pooled connection became free within {self._timeout} seconds"
+                )
+            try:
+                return self._idle.get(timeout=min(remaining, 0.1))
+            except queue.Empty:
+                pass
+        raise sqlite3.ProgrammingError("Cannot operate on a closed storage")
+
+    def release(self, conn):
+        if not self._thread_affinity:
+            self._held.count -= 1
+            self._idle.put(conn)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+
+class _CharacterCache:  # Bounded, thread-safe LRU cache of loaded characters by id
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._version = 0   # Bumped by every invalidation
+        self._lock = threading.Lock()
+
+    def get(self, char_id):  # Returning (character or None, version to pass to put)
+        with self._lock:
+            character = self._entries.get(char_id)
+            if character is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(char_id)
+            return character, self._version
+
+    # Storing a loaded character, unless something was invalidated since it was read;
+    # this keeps a read that raced with a write from caching the old row
+    def put(self, char_id, character, version):
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[char_id] = character
+            self._entries.move_to_end(char_id)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, char_ids):
+        with self._lock:
+            self._version += 1
+            for char_id in char_ids:
+                self._entries.pop(char_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
 
 
 class CharacterStorage:
-    def __init__(self, db_path="bg3_characters.db"):
+    # cache_size > 0 turns on an LRU cache for load_character. Cached characters are shared
+    # between callers, so edit them with Character.with_changes rather than in place.
+    # migration_progress(version, description, done, total) reports schema upgrades.
+    # thread_affinity pins one pooled connection to each thread (at most pool_size threads).
+    def __init__(
+        self,
+        db_path="bg3_characters.db",
+        pool_size=4,
+        wal=True,
+        pragmas=None,
+        cache_size=0,
+        migration_progress=None,
+        thread_affinity=False,
+    ):
         self.db_path = Path(db_path)
-        self._ensure_tables()
-
-    def _connect(self): # Opening a new SQLite connection
-        return sqlite3.connect(self.db_path)
-
-    def _ensure_tables(self):   # Creating tables if they don't exist
-        with self._connect() as conn:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS characters (
-                    id TEXT PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    origin TEXT,
-                    race TEXT,
-                    character_class TEXT,
-                    subclass TEXT,
-                    background TEXT,
-                    ability_scores TEXT,
-                    ability_bonuses TEXT,
-                    skills TEXT,
-                    feats TEXT
-                );
-                """
-            )
-            conn.commit()
+        self.migration_progress = migration_progress
+        self._cache = _CharacterCache(cache_size) if cache_size > 0 else None
+        self.wal = wal
+        self.pragmas = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+        # Every in-memory connection is its own database, so those get exactly one
+        if str(db_path) == ":memory:":
+            pool_size = 1
+        self._pool = _ConnectionPool(self._open_connection, pool_size, thread_affinity)
+        try:
+            self._ensure_tables()
+        except BaseException:
+            self._pool.close()
+            raise
+
+    def _open_connection(self):  # Opening and tuning a new SQLite connection for the pool
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA foreign_keys=ON")
+        if self.wal:
+            conn.execute("PRAGMA journal_mode=WAL")
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    @contextmanager
+    def _connection(self):  # Borrowing a pooled connection; commits on success, rolls back on error
+        conn = self._pool.acquire()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._pool.release(conn)
+
+    # Public access for modules that run their own SQL (roster_stats): a pooled connection
+    # inside one transaction. Reads in a read_transaction all see the same snapshot;
+    # write_transaction takes the write lock up front and commits when the block ends; it
+    # bypasses the load_character cache, so it is not for editing characters.
+    @contextmanager
+    def read_transaction(self):
+        with self._connection() as conn:
+            conn.execute("BEGIN")
+            yield conn
+
+    @contextmanager
+    def write_transaction(self):
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+
+    def close(self):    # Closing every pooled connection
+        self._pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _ensure_tables(self):   # Bringing the schema up to date through versioned migrations
+        with self._connection() as conn:
+            runner = migrations.MigrationRunner(conn, progress=self.migration_progress)
+            runner.run(MIGRATIONS)
+
+    def _invalidate(self, char_ids):  # Dropping written ids from the cache, if there is one
+        if self._cache is not None:
+            self._cache.invalidate(char_ids)
+
+    # Hit/miss/eviction counters of the load_character cache, or None if it is off
+    def cache_stats(self):
+        return self._cache.stats() if self._cache is not None else None
 
     def save_character(self, character):    # Inserting or updating a character in the database
-        data = character.to_dict()
-        with self._connect() as conn:
-            conn.execute(
-                """
-                INSERT OR REPLACE INTO characters (
-                    id, name, origin, race, character_class, subclass, background,
-                    ability_scores, ability_bonuses, skills, feats
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    data["id"],
-                    data["name"],
-                    data["origin"],
-                    data["race"],
-                    data["character_class"],
-                    data["subclass"],
-                    data["background"],
-                    json.dumps(data["ability_scores"]),
-                    json.dumps(data["ability_bonuses"]),
-                    json.dumps(data["skills"]),
-                    json.dumps(data["feats"])
-                )
-            )
-            conn.commit()
+        with self._connection() as conn:
+            _write_characters(conn, [_character_rows(character)])
+        self._invalidate([character.id])
 
-    def load_character(self, char_id):  # Loading a character by id
-        with self._connect() as conn:
-            cur = conn.execute(
-                "SELECT id, name, origin, race, character_class, subclass, background, "
-                "ability_scores, ability_bonuses, skills, feats "
-                "FROM characters WHERE id = ?",
-                (char_id,),
-            )
-            row = cur.fetchone()
+    # Saving characters from any iterable (generators too) with executemany and one
+    # transaction per batch; returns how many characters were saved
+    def save_characters(self, characters, batch_size=1000):
+        saved = 0
+        for batch in utils.batched(characters, batch_size):
+            rows = [_character_rows(character) for character in batch]
+            with self._connection() as conn:
+                _write_characters(conn, rows)
+            self._invalidate([row[0] for row, _, _ in rows])
+            saved += len(rows)
+        return saved
+
+    def load_character(self, char_id):  # Loading a character by id, through the cache if on
+        version = None
+        if self._cache is not None:
+            character, version = self._cache.get(char_id)
+            if character is not None:
+                return character
+
+        with self._connection() as conn:
+            row = conn.execute(_SELECT_SQL + " WHERE c.id = ?", (char_id,)).fetchone()
 
         if not row:
             return None
-
-        (
-            id_,
-            name,
-            origin,
-            race,
-            character_class,
-            subclass,
-            background,
-            ability_scores_json,
-            ability_bonuses_json,
-            skills_json,
-            feats_json,
-        ) = row
-
-        data = {
-            "id": id_,
-            "name": name,
-            "origin": origin,
-            "race": race,
-            "character_class": character_class,
-            "subclass": subclass,
-            "background": background,
-            "ability_scores": json.loads(ability_scores_json),
-            "ability_bonuses": json.loads(ability_bonuses_json),
-            "skills": json.loads(skills_json),
-            "feats": json.loads(feats_json)
-        }
-        return Character.from_dict(data)
+        character = _row_to_character(row)
+        if self._cache is not None:
+            self._cache.put(char_id, character, version)
+        return character
 
     def load_all_characters(self):  # Returning a list of all saved characters
-        with self._connect() as conn:
+        return self.query()
+
+    # One page of characters ordered by (name COLLATE NOCASE, id), starting after the
+    # (name, id) key given in after; pass the last character's key to get the next page
+    def characters_page(self, page_size=50, after=None):
+        sql = _SELECT_SQL
+        params = []
+        if after is not None:
+            # Collation on the parameter side lets SQLite seek in idx_characters_name
+            sql += " WHERE (c.name, c.id) > (? COLLATE NOCASE, ?)"
+            params.extend(after)
+        sql += " ORDER BY c.name COLLATE NOCASE, c.id LIMIT ?"
+        params.append(page_size)
+
+        with self._connection() as conn:
+            cur = conn.execute(sql, params)
+            return [_row_to_character(row) for row in cur]
+
+    # Listing (id, name) summaries in (name COLLATE NOCASE, id) order without loading
+    # full characters; page_size and after work as in characters_page, or omit both for all
+    def list_summaries(self, page_size=None, after=None):
+        sql = "SELECT id, name FROM characters"
+        params = []
+        if after is not None:
+            sql += " WHERE (name, id) > (? COLLATE NOCASE, ?)"
+            params.extend(after)
+        sql += " ORDER BY name COLLATE NOCASE, id"
+        if page_size is not None:
+            sql += " LIMIT ?"
+            params.append(page_size)
+
+        with self._connection() as conn:
+            cur = conn.execute(sql, params)
+            return [CharacterSummary._make(row) for row in cur]
+
+    # Full-text search over name, origin, race, class, subclass, background, skills and
+    # feats; every word must match (as a prefix) and results come best match first
+    def search(self, text, limit=20):
+        words = [word.replace('"', "") for word in text.split()]
+        words = [word for word in words if word]
+        if not words:
+            return []
+        match = " ".join(f'"{word}"*' for word in words)
+
+        with self._connection() as conn:
             cur = conn.execute(
-                "SELECT id, name, origin, race, character_class, subclass, background, "
-                "ability_scores, ability_bonuses, skills, feats FROM characters "
-                "ORDER BY name COLLATE NOCASE"
+                _SELECT_SQL + " JOIN characters_fts AS f ON f.rowid = c.rowid "
+                "WHERE characters_fts MATCH ? ORDER BY f.rank LIMIT ?",
+                (match, limit),
             )
-            rows = cur.fetchall()
+            return [_row_to_character(row) for row in cur]
 
-        characters = []
-        for row in rows:
-            (
-                id_,
-                name,
-                origin,
-                race,
-                character_class,
-                subclass,
-                background,
-                ability_scores_json,
-                ability_bonuses_json,
-                skills_json,
-                feats_json
-            ) = row
-
-            data = {
-                "id": id_,
-                "name": name,
-                "origin": origin,
-                "race": race,
-                "character_class": character_class,
-                "subclass": subclass,
-                "background": background,
-                "ability_scores": json.loads(ability_scores_json),
-                "ability_bonuses": json.loads(ability_bonuses_json),
-                "skills": json.loads(skills_json),
-                "feats": json.loads(feats_json)
-            }
-            characters.append(Character.from_dict(data))
+    # Streaming every character (after an optional key) page by page; a connection is only
+    # held while a page is read, so the consumer can take as long as it likes between rows
+    def iter_characters(self, page_size=500, after=None):
+        while True:
+            page = self.characters_page(page_size, after)
+            yield from page
+            if len(page) < page_size:
+                return
+            after = page_key(page[-1])
+
+    # Returning which of the given ids are already saved, with one query
+    def existing_ids(self, char_ids):
+        char_ids = list(char_ids)
+        if not char_ids:
+            return set()
+        with self._connection() as conn:
+            return _stored_ids(conn, char_ids)
 
-        return characters
+    # Finding characters with the filtering, sorting and limit done in SQL. Filters come as a
+    # CharacterFilters or as its fields by keyword, e.g. query(race="Elf", skills=["Stealth"]).
+    def query(
+        self, filters=None, order_by="name", descending=False, limit=None, offset=None, **criteria
+    ):
+        if filters is None:
+            filters = CharacterFilters(**criteria)
+        elif criteria:
+            raise TypeError("Pass filters either as a CharacterFilters or by keyword, not both")
+
+        params = []
+        conditions = _filter_conditions(filters, params)
+        if order_by not in _ORDER_COLUMNS:
+            raise ValueError(f"Cannot order by {order_by!r}")
+        direction = "DESC" if descending else "ASC"
+
+        sql = _SELECT_SQL
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY {_ORDER_COLUMNS[order_by]} {direction}, c.id {direction}"
+        if limit is not None or offset is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([-1 if limit is None else limit, offset or 0])
+
+        with self._connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [_row_to_character(row) for row in rows]
 
     def delete_character(self, char_id):    # Deleting a character by id
-        with self._connect() as conn:
+        with self._connection() as conn:
             conn.execute("DELETE FROM characters WHERE id = ?", (char_id,))
-            conn.commit()
+        self._invalidate([char_id])
+
+    # Deleting characters by id from any iterable, one transaction per batch;
+    # returns how many rows were actually deleted
+    def delete_characters(self, char_ids, batch_size=1000):
+        deleted = 0
+        for batch in utils.batched(char_ids, batch_size):
+            with self._connection() as conn:
+                cur = conn.executemany(
+                    "DELETE FROM characters WHERE id = ?",
+                    [(char_id,) for char_id in batch],
+                )
+                deleted += cur.rowcount
+            self._invalidate(batch)
+        return deleted
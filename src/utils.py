@@ -23,3 +23,17 @@ def ensure_directory(path):
     p = Path(path)
     p.mkdir(parents=True, exist_ok=True)
     return p
+
+
+# Yielding lists of up to size items from any iterable without materializing it
+def batched(iterable, size):
+    if size < 1:
+        raise ValueError(f"Batch size must be positive, got {size}")
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
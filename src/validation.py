@@ -0,0 +1,173 @@
+"""Precompiled validation of character choices against BG3 data and point-buy rules"""
+
+from dataclasses import dataclass, field
+
+from src import data_bg3
+from src import point_buy
+
+_REQUIRED_FIELDS = (
+    "name",
+    "origin",
+    "race",
+    "character_class",
+    "subclass",
+    "background",
+    "base_scores",
+    "plus_two_ability",
+    "plus_one_ability",
+    "skills",
+)
+
+
+@dataclass
+class ValidationResult:     # Outcome for one record of validate_many
+    index: int
+    character: object = None
+    errors: list = field(default_factory=list)
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+# Membership test that treats anything but a string as not allowed (lists, dicts and other
+# unhashable values would otherwise raise TypeError)
+def _allowed(value, values):
+    return isinstance(value, str) and value in values
+
+
+def _is_score(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class ChoiceValidator:
+    # Lookup sets are built once from data_bg3 instead of scanning the lists per check
+    def __init__(self):
+        self.origins = frozenset(data_bg3.ORIGINS)
+        self.races = frozenset(data_bg3.RACES)
+        self.classes = frozenset(data_bg3.CLASSES)
+        self.subclasses_by_class = {
+            char_class: frozenset(subclasses)
+            for char_class, subclasses in data_bg3.SUBCLASSES_BY_CLASS.items()
+        }
+        self.backgrounds = frozenset(data_bg3.BACKGROUNDS)
+        self.abilities = frozenset(data_bg3.ABILITY_SCORES)
+        self.skills = frozenset(data_bg3.SKILLS)
+        self.feats = frozenset(data_bg3.FEATS)
+
+    # Returning every problem with a choices dict (keyword arguments of
+    # build_character_from_choices), in the order they used to be raised
+    def errors(self, choices):
+        missing = [name for name in _REQUIRED_FIELDS if name not in choices]
+        if missing:
+            return [f"Missing field: {name}" for name in missing]
+
+        errors = []
+        if not isinstance(choices["name"], str) or not choices["name"]:
+            errors.append(f"Invalid name: {choices['name']!r}")
+        if not _allowed(choices["origin"], self.origins):
+            errors.append(f"Invalid origin: {choices['origin']}")
+        if not _allowed(choices["race"], self.races):
+            errors.append(f"Invalid race: {choices['race']}")
+
+        errors.extend(self.class_errors(choices["character_class"], choices["subclass"]))
+
+        if not _allowed(choices["background"], self.backgrounds):
+            errors.append(f"Invalid background: {choices['background']}")
+
+        errors.extend(self.score_errors(
+            choices["base_scores"],
+            choices["plus_two_ability"],
+            choices["plus_one_ability"],
+        ))
+        errors.extend(self.skill_errors(choices["skills"]))
+        errors.extend(self.feat_errors(choices.get("feats") or []))
+        return errors
+
+    def class_errors(self, character_class, subclass):
+        errors = []
+        if not _allowed(character_class, self.classes):
+            errors.append(f"Invalid class: {character_class}")
+            return errors
+        valid_subclasses = self.subclasses_by_class.get(character_class)
+        if valid_subclasses and not _allowed(subclass, valid_subclasses):
+            errors.append(f"Invalid subclass {subclass!r} for class {character_class!r}")
+        return errors
+
+    def score_errors(self, base_scores, plus_two_ability, plus_one_ability):
+        errors = []
+        if not isinstance(base_scores, dict) or base_scores.keys() != self.abilities:
+            errors.append(
+                "Base scores must include all abilities: " + ", ".join(data_bg3.ABILITY_SCORES)
+            )
+        elif not all(_is_score(score) for score in base_scores.values()):
+            errors.append("Base scores must be whole numbers")
+        elif not point_buy.is_valid_point_buy(base_scores):
+            errors.append("Ability scores do not satisfy 27-point point-buy rules")
+
+        if plus_two_ability == plus_one_ability:
+            errors.append("+2 and +1 bonuses must be applied to different abilities")
+        for ability in (plus_two_ability, plus_one_ability):
+            if not _allowed(ability, self.abilities):
+                errors.append(f"Unknown ability code: {ability}")
+        return errors
+
+    def skill_errors(self, skills):
+        if not isinstance(skills, (list, tuple)):
+            return ["Skills must be a list"]
+        errors = []
+        if len(skills) != 4:
+            errors.append("You must select 4 skills")
+        for skill in skills:
+            if not _allowed(skill, self.skills):
+                errors.append(f"Unknown skill: {skill}")
+        return errors
+
+    def feat_errors(self, feats):
+        if not isinstance(feats, (list, tuple)):
+            return ["Feats must be a list"]
+        return [f"Unknown feat: {feat}" for feat in feats if not _allowed(feat, self.feats)]
+
+    # Checking only the fields being changed on an existing character.
+    # Class and subclass are checked together, against the values the edit would produce.
+    def change_errors(self, character, changes):
+        errors = []
+        for name in ("id", "name"):
+            if name in changes and (not isinstance(changes[name], str) or not changes[name]):
+                errors.append(f"Invalid {name}: {changes[name]!r}")
+        if "origin" in changes and not _allowed(changes["origin"], self.origins):
+            errors.append(f"Invalid origin: {changes['origin']}")
+        if "race" in changes and not _allowed(changes["race"], self.races):
+            errors.append(f"Invalid race: {changes['race']}")
+
+        if "character_class" in changes or "subclass" in changes:
+            errors.extend(self.class_errors(
+                changes.get("character_class", character.character_class),
+                changes.get("subclass", character.subclass),
+            ))
+
+        if "background" in changes and not _allowed(changes["background"], self.backgrounds):
+            errors.append(f"Invalid background: {changes['background']}")
+        # The character's own class is used so validation doesn't import models
+        if "ability_scores" in changes and not isinstance(
+            changes["ability_scores"], type(character.ability_scores)
+        ):
+            errors.append(f"Invalid ability scores: {changes['ability_scores']!r}")
+        if "ability_bonuses" in changes:
+            bonuses = changes["ability_bonuses"]
+            if not isinstance(bonuses, dict):
+                errors.append(f"Invalid ability bonuses: {bonuses!r}")
+            else:
+                for ability, bonus in bonuses.items():
+                    if not _allowed(ability, self.abilities):
+                        errors.append(f"Unknown ability code: {ability}")
+                    elif not _is_score(bonus):
+                        errors.append(f"Invalid bonus for {ability}: {bonus!r}")
+        if "skills" in changes:
+            errors.extend(self.skill_errors(changes["skills"]))
+        if "feats" in changes:
+            errors.extend(self.feat_errors(changes["feats"]))
+        return errors
+
+
+VALIDATOR = ChoiceValidator()
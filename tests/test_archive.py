@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+from src.archive import ArchiveReader, ArchiveWriter, write_archive
+from src.services import CharacterGenerationService
+
+
+@pytest.fixture
+def characters():
+    return list(CharacterGenerationService(random.Random(4)).random_characters(20))
+
+
+def test_round_trip(tmp_path, characters):
+    path = tmp_path / "roster.bg3a"
+    assert write_archive(characters, path) == 20
+
+    with ArchiveReader(path) as reader:
+        assert len(reader) == 20
+        assert reader[-1].to_dict() == characters[-1].to_dict()
+        assert [c.to_dict() for c in reader] == [c.to_dict() for c in characters]
+
+
+@pytest.mark.parametrize("changes", [{"name": "x" * 65}, {"feats": ["Not A Feat"]}])
+def test_failed_write_leaves_no_archive(tmp_path, characters, changes):
+    path = tmp_path / "roster.bg3a"
+    bad = characters[5].to_dict()
+    bad.update(changes)
+    characters[5] = type(characters[5]).from_dict(bad)
+
+    with pytest.raises(ValueError):
+        write_archive(characters, path)
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_failed_write_keeps_previous_archive(tmp_path, characters):
+    path = tmp_path / "roster.bg3a"
+    write_archive(characters[:3], path)
+
+    with pytest.raises(RuntimeError):
+        with ArchiveWriter(path) as writer:
+            writer.write(characters[3])
+            raise RuntimeError("interrupted")
+
+    with ArchiveReader(path) as reader:
+        assert [c.id for c in reader] == [c.id for c in characters[:3]]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["roster.bg3a"]
@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+from src import exporters
+from src.html_templates import Markup, Template
+from src.models import Character
+from src.services import CharacterGenerationService
+
+
+@pytest.fixture
+def character():
+    return CharacterGenerationService(random.Random(1)).random_character("Tav")
+
+
+def test_character_page_escapes_values(character):
+    page = exporters.character_to_html(character.with_changes(name='<b>"Tav" & co</b>'))
+
+    assert "<h1>&lt;b&gt;&quot;Tav&quot; &amp; co&lt;/b&gt;</h1>" in page
+    assert "<b>" not in page
+
+
+def test_character_page_renders_any_bonus_value(character):
+    record = character.to_dict()
+    record["ability_bonuses"] = {"STR": 2.0, "DEX": 1}
+
+    page = exporters.character_to_html(Character.from_dict(record))
+
+    assert "<tr><td>STR</td>" in page and "<td>2.0</td>" in page
+
+
+def test_template_renders_by_keyword():
+    template = Template("<p class=\"{kind}\">{{{text}}}</p>{extra}")
+
+    assert template.fields == ["kind", "text", "extra"]
+    assert template.render(extra=Markup("<br>"), text="a<b", kind=None) == (
+        '<p class="">{a&lt;b}</p><br>'
+    )
+    with pytest.raises(ValueError):
+        template.render(kind="x", text="y")
+    with pytest.raises(ValueError):
+        Template("{value:d}")
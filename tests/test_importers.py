@@ -0,0 +1,106 @@
+import io
+import json
+import random
+
+import pytest
+
+from src import exporters
+from src import importers
+from src.importers import import_characters
+from src.services import CharacterGenerationService
+from src.storage_db import CharacterStorage
+
+
+@pytest.fixture
+def characters():
+    return list(CharacterGenerationService(random.Random(1)).random_characters(3))
+
+
+@pytest.fixture
+def storage(tmp_path):
+    with CharacterStorage(tmp_path / "characters.db") as storage:
+        yield storage
+
+
+def _write_jsonl(path, records):
+    path.write_text("\n".join(json.dumps(record) for record in records) + "\n", encoding="utf-8")
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"origin": ["x"]},
+        {"origin": {"a": 1}},
+        {"name": None},
+        {"skills": [["a"]]},
+        {"skills": None, "feats": [1]},
+        {"ability_bonuses": {"STR": "2", "DEX": 1}},
+        {"ability_bonuses": {"STR": True, "DEX": 2}},
+        {"ability_bonuses": [2, 1]},
+        {"ability_scores": {"STR": "8"}},
+    ],
+)
+def test_malformed_record_is_reported_not_raised(tmp_path, storage, characters, changes):
+    good, bad = characters[0].to_dict(), {**characters[1].to_dict(), **changes}
+    path = tmp_path / "roster.jsonl"
+    _write_jsonl(path, [good, bad])
+
+    report = import_characters(storage, path)
+
+    assert report.imported == 1
+    assert report.invalid == 1
+    assert report.errors[0].record == 2
+    assert storage.load_character(good["id"]).to_dict() == good
+
+
+def test_mixed_file_imports_good_records(tmp_path, storage, characters):
+    records = [character.to_dict() for character in characters]
+    records[1]["race"] = "Orc"
+    path = tmp_path / "roster.jsonl"
+    path.write_text(
+        json.dumps(records[0]) + "\n{bad json\n" + json.dumps(records[1]) + "\n[1]\n"
+        + json.dumps(records[2]) + "\n",
+        encoding="utf-8",
+    )
+
+    report = import_characters(storage, path, error_report=tmp_path / "errors.jsonl")
+
+    assert (report.read, report.imported, report.invalid) == (5, 2, 3)
+    assert [issue.record for issue in report.errors] == [2, 3, 4]
+    assert len((tmp_path / "errors.jsonl").read_text(encoding="utf-8").splitlines()) == 3
+
+
+def test_json_array_round_trip_and_conflicts(tmp_path, storage, characters):
+    path = tmp_path / "roster.json"
+    path.write_text(json.dumps([c.to_dict() for c in characters], indent=2), encoding="utf-8")
+
+    assert import_characters(storage, path).imported == 3
+    for character in characters:
+        assert storage.load_character(character.id).to_dict() == character.to_dict()
+
+    assert import_characters(storage, path).skipped == 3
+    assert import_characters(storage, path, on_conflict="replace").replaced == 3
+    assert import_characters(storage, path, on_conflict="new_id").renamed == 3
+    assert len(storage.load_all_characters()) == 6
+    with pytest.raises(ValueError):
+        import_characters(storage, path, on_conflict="error")
+
+
+def test_jsonl_export_imports_back(tmp_path, storage, characters):
+    path = tmp_path / "roster.jsonl"
+    exporters.export_roster_jsonl(characters, path)
+
+    report = import_characters(storage, path)
+
+    assert report.ok and report.imported == 3
+
+
+@pytest.mark.parametrize("chunk", [1, 2, 3, 7])
+def test_numbers_split_across_read_chunks(monkeypatch, chunk):
+    monkeypatch.setattr(importers, "_READ_CHUNK", chunk)
+    text = '[1.5, 12345,-3, 1e5 ,2.5e-3, true, {"a": 1.25}, "x"]'
+
+    records = list(importers.iter_records(io.StringIO(text)))
+
+    assert [value for _, value, _ in records] == json.loads(text)
+    assert all(error is None for _, _, error in records)
@@ -0,0 +1,131 @@
+import json
+import random
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+from src import migrations
+from src.services import CharacterGenerationService
+from src.storage_db import MIGRATIONS, CharacterStorage
+
+# The original single-table layout, with lists and dicts stored as JSON text
+_LEGACY_SCHEMA_SQL = """
+CREATE TABLE characters (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    origin TEXT,
+    race TEXT,
+    character_class TEXT,
+    subclass TEXT,
+    background TEXT,
+    ability_scores TEXT,
+    ability_bonuses TEXT,
+    skills TEXT,
+    feats TEXT
+)
+"""
+
+
+class _Interrupted(Exception):
+    pass
+
+
+def _legacy_db(path, count):
+    characters = list(CharacterGenerationService(random.Random(1)).random_characters(count))
+    with closing(sqlite3.connect(path)) as conn, conn:
+        conn.execute(_LEGACY_SCHEMA_SQL)
+        conn.executemany(
+            "INSERT INTO characters VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    data["id"], data["name"], data["origin"], data["race"],
+                    data["character_class"], data["subclass"], data["background"],
+                    json.dumps(data["ability_scores"]), json.dumps(data["ability_bonuses"]),
+                    json.dumps(data["skills"]), json.dumps(data["feats"]),
+                )
+                for data in (character.to_dict() for character in characters)
+            ],
+        )
+    return characters
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    path = tmp_path / "legacy.db"
+    return path, _legacy_db(path, 45)
+
+
+def _assert_upgraded(path, characters):
+    with CharacterStorage(path) as storage:
+        with storage.read_transaction() as conn:
+            assert migrations.schema_version(conn) == 2
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+        assert "characters_json" not in tables
+        for character in characters:
+            assert storage.load_character(character.id).to_dict() == character.to_dict()
+        assert len(storage.load_all_characters()) == len(characters)
+        assert len(storage.search(characters[0].name, limit=100)) >= 1
+
+
+def test_legacy_database_upgrades_to_latest_version(legacy_db):
+    path, characters = legacy_db
+    progress = []
+
+    with CharacterStorage(path, migration_progress=lambda *args: progress.append(args)):
+        pass
+
+    assert [(version, done, total) for version, _, done, total in progress] == [
+        (1, 45, 45), (2, 45, 45)
+    ]
+    _assert_upgraded(path, characters)
+
+
+def test_interrupted_backfill_resumes(legacy_db):
+    path, characters = legacy_db
+
+    def stop_after_first_chunk(version, description, done, total):
+        raise _Interrupted(f"{description}: {done}/{total}")
+
+    with closing(sqlite3.connect(path)) as conn:
+        runner = migrations.MigrationRunner(conn, batch_size=10, progress=stop_after_first_chunk)
+        with pytest.raises(_Interrupted):
+            runner.run(MIGRATIONS)
+        assert migrations.schema_version(conn) == 0
+        assert conn.execute(
+            "SELECT done FROM schema_migration_progress WHERE version = 1"
+        ).fetchone() == (10,)
+        assert conn.execute("SELECT count(*) FROM characters").fetchone() == (10,)
+        assert conn.execute("SELECT count(*) FROM characters_json").fetchone() == (45,)
+
+    progress = []
+    with CharacterStorage(path, migration_progress=lambda *args: progress.append(args)):
+        pass
+
+    assert progress[0][2:] == (45, 45)   # Resumed from 10, finished in one chunk
+    _assert_upgraded(path, characters)
+
+
+def test_bad_legacy_row_names_the_character(legacy_db):
+    path, characters = legacy_db
+    with closing(sqlite3.connect(path)) as conn, conn:
+        conn.execute(
+            "UPDATE characters SET ability_scores = ? WHERE id = ?",
+            (json.dumps({**characters[5].ability_scores.as_dict(), "STR": -1}), characters[5].id),
+        )
+
+    with pytest.raises(ValueError, match=f"{characters[5].id}.*STR score"):
+        CharacterStorage(path)
+
+
+# Batches bigger than the 999 query parameters older SQLite versions allow
+def test_large_batches_stay_under_the_old_parameter_limit(tmp_path):
+    path = tmp_path / "legacy.db"
+    characters = _legacy_db(path, 1200)
+
+    with closing(sqlite3.connect(path)) as conn:
+        conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+        runner = migrations.MigrationRunner(conn, batch_size=1100)
+        assert runner.run(MIGRATIONS) == [1, 2]
+
+    _assert_upgraded(path, characters)
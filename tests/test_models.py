@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from src import models
+from src.models import AbilityScores, Character
+from src.services import CharacterGenerationService
+
+
+def test_unknown_categorical_values_are_not_interned():
+    record = CharacterGenerationService(random.Random(1)).random_character("Tav").to_dict()
+    known = len(models._ORIGIN_CODES.values)  # pylint: disable=protected-access
+
+    characters = [Character.from_dict({**record, "origin": f"Origin {i}"}) for i in range(1000)]
+
+    assert len(models._ORIGIN_CODES.values) == known  # pylint: disable=protected-access
+    assert [character.origin for character in characters[:3]] == [
+        "Origin 0", "Origin 1", "Origin 2"
+    ]
+    assert Character.from_dict(characters[0].to_dict()) == characters[0]
+
+
+def test_unhashable_and_known_values_round_trip():
+    record = CharacterGenerationService(random.Random(1)).random_character("Tav").to_dict()
+    character = Character.from_dict({**record, "race": ["Elf"], "subclass": None})
+
+    assert (character.race, character.subclass) == (["Elf"], None)
+    assert character.with_changes(race="Human").race == "Human"
+    assert Character.from_dict(record).to_dict() == record
+
+
+@pytest.mark.parametrize("score", [-1, 256, "8", 8.0, None])
+def test_bad_score_names_the_ability(score):
+    with pytest.raises(ValueError, match="DEX score"):
+        AbilityScores(8, score, 8, 8, 8, 8)
+
+    scores = AbilityScores(8, 8, 8, 8, 8, 8)
+    with pytest.raises(ValueError, match="CHA score"):
+        scores.CHA = score
+    assert scores.CHA == 8
+
+
+def test_with_changes_copy_is_independent():
+    character = CharacterGenerationService(random.Random(1)).random_character("Tav")
+    original = character.to_dict()
+    skills = ["Arcana", "History", "Insight", "Perception"]
+
+    edited = character.with_changes(name="Gale")
+    edited.skills.append("Stealth")
+    edited.feats.append("Alert")
+    edited.ability_bonuses["STR"] = 5
+    edited.ability_scores.STR = 1
+    renamed = character.with_changes(skills=skills)
+    skills.append("Stealth")
+
+    assert character.to_dict() == original
+    assert renamed.skills == skills[:4]
@@ -0,0 +1,56 @@
+from itertools import product
+
+import pytest
+
+from src import point_buy
+
+np = pytest.importorskip("numpy")
+
+ABILITIES = ("STR", "DEX", "CON", "INT", "WIS", "CHA")
+
+
+def test_allocation_table_is_every_valid_point_buy():
+    expected = [
+        scores for scores in product(range(8, 16), repeat=6)
+        if point_buy.is_valid_point_buy(dict(zip(ABILITIES, scores)))
+    ]
+
+    assert list(point_buy.valid_allocations(ABILITIES)) == expected
+    assert point_buy.valid_allocations(ABILITIES, total_points=100) == ()
+
+
+def test_batch_validity_matches_scalar():
+    rows = np.random.default_rng(1).integers(6, 18, size=(2000, 6))
+    rows[:10] = point_buy.random_point_buy_batch(10, rng=2)
+
+    expected = [point_buy.is_valid_point_buy(dict(zip(ABILITIES, row))) for row in rows.tolist()]
+
+    assert point_buy.is_valid_point_buy_batch(rows).tolist() == expected
+    assert any(expected)
+
+
+def test_fractional_scores_are_invalid_not_truncated():
+    rows = [
+        [15.9, 15, 15, 8, 8, 8],
+        [15.0, 15, 15, 8, 8, 8],
+        [float("nan"), 15, 15, 8, 8, 8],
+        [float("inf"), 15, 15, 8, 8, 8],
+    ]
+    expected = [point_buy.is_valid_point_buy(dict(zip(ABILITIES, row))) for row in rows]
+
+    assert point_buy.is_valid_point_buy_batch(rows).tolist() == expected == [
+        False, True, False, False
+    ]
+    assert point_buy.total_cost_batch(rows[1:2]).tolist() == [27]
+    with pytest.raises(ValueError):
+        point_buy.total_cost_batch(rows[:1])
+    with pytest.raises(ValueError):
+        point_buy.is_valid_point_buy_batch([["15", "15", "15", "8", "8", "8"]])
+
+
+def test_random_batch_rows_are_valid():
+    rows = point_buy.random_point_buy_batch(500, rng=3)
+
+    assert rows.shape == (500, 6)
+    assert point_buy.is_valid_point_buy_batch(rows).all()
+    assert (point_buy.total_cost_batch(rows) == 27).all()
@@ -0,0 +1,38 @@
+import random
+
+import pytest
+
+from src import roster_stats
+from src.services import CharacterGenerationService
+from src.storage_db import CharacterStorage
+
+
+@pytest.fixture
+def storage(tmp_path):
+    with CharacterStorage(tmp_path / "characters.db") as storage:
+        storage.save_characters(
+            CharacterGenerationService(random.Random(1)).random_characters(50)
+        )
+        yield storage
+
+
+def test_summary_tables_give_the_same_summary(storage):
+    expected = roster_stats.roster_summary(storage)
+
+    roster_stats.enable_summary_tables(storage)
+    assert roster_stats.roster_summary(storage) == expected
+    roster_stats.disable_summary_tables(storage)
+    assert roster_stats.roster_summary(storage) == expected
+    assert expected["characters"] == 50
+
+
+def test_read_transaction_sees_one_snapshot(storage):
+    extra = list(CharacterGenerationService(random.Random(2)).random_characters(5))
+
+    with storage.read_transaction() as conn:
+        before = conn.execute("SELECT count(*) FROM characters").fetchone()[0]
+        storage.save_characters(extra)
+        after = conn.execute("SELECT count(*) FROM characters").fetchone()[0]
+
+    assert before == after == 50
+    assert roster_stats.roster_summary(storage)["characters"] == 55
@@ -0,0 +1,39 @@
+import random
+
+import pytest
+
+from src.services import CharacterGenerationService
+
+
+@pytest.mark.parametrize(
+    "constraints",
+    [
+        {"character_class": "Wizard", "subclass": "Thief"},
+        {"min_scores": {"STR": 18, "DEX": 18, "CON": 18}},
+        {"min_scores": {"LUCK": 10}},
+        {"required_skills": ["Cooking"]},
+        {"required_skills": ["Arcana", "History", "Nature", "Religion", "Insight"]},
+        {"feat": "Not A Feat"},
+    ],
+)
+def test_impossible_constraints_do_not_advance_the_rng(constraints):
+    rng = random.Random(11)
+    service = CharacterGenerationService(rng)
+    state = rng.getstate()
+
+    with pytest.raises(ValueError):
+        service.random_character("Tav", {"origin": "Gale", "race": None, **constraints})
+
+    assert rng.getstate() == state
+
+
+def test_constraints_are_respected():
+    service = CharacterGenerationService(random.Random(3))
+    for _ in range(50):
+        character = service.random_character(
+            "Tav",
+            {"subclass": "Thief", "min_scores": {"DEX": 17}, "required_skills": ["Stealth"]},
+        )
+        assert (character.character_class, character.subclass) == ("Rogue", "Thief")
+        assert character.ability_scores.DEX >= 17
+        assert "Stealth" in character.skills
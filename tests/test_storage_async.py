@@ -0,0 +1,76 @@
+import asyncio
+import random
+
+import pytest
+
+from src.services import CharacterGenerationService
+from src.storage_async import AsyncCharacterStorage
+
+
+@pytest.fixture
+def characters():
+    return list(CharacterGenerationService(random.Random(1)).random_characters(3))
+
+
+def test_merged_saves_of_one_id_keep_the_last(tmp_path, characters):
+    character = characters[0]
+
+    async def run():
+        async with AsyncCharacterStorage(tmp_path / "characters.db") as storage:
+            await asyncio.gather(
+                storage.save_character(character),
+                storage.save_character(character.with_changes(name="Gale v2")),
+                storage.save_character(characters[1]),
+            )
+            return await storage.load_character(character.id), await storage.load_all_characters()
+
+    loaded, everyone = asyncio.run(run())
+
+    assert loaded.name == "Gale v2"
+    assert len(everyone) == 2
+
+
+def test_bad_save_fails_only_its_own_caller(tmp_path, characters):
+    async def run():
+        async with AsyncCharacterStorage(tmp_path / "characters.db") as storage:
+            results = await asyncio.gather(
+                storage.save_character(characters[0]),
+                storage.save_character(object()),
+                storage.save_character(characters[1]),
+                return_exceptions=True,
+            )
+            return results, await storage.load_all_characters()
+
+    results, saved = asyncio.run(run())
+
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], AttributeError)
+    assert {character.id for character in saved} == {characters[0].id, characters[1].id}
+
+
+def test_concurrent_identical_reads_share_one_query(tmp_path, characters):
+    async def run():
+        async with AsyncCharacterStorage(tmp_path / "characters.db") as storage:
+            await storage.save_characters(characters)
+            return await asyncio.gather(
+                *(storage.load_character(characters[0].id) for _ in range(20)),
+                storage.load_character(characters[1].id),
+            )
+
+    *shared, other = asyncio.run(run())
+
+    assert all(loaded is shared[0] for loaded in shared)
+    assert shared[0].to_dict() == characters[0].to_dict()
+    assert other.id == characters[1].id
+
+
+def test_in_memory_database_does_not_hang(characters):
+    async def run():
+        async with AsyncCharacterStorage(":memory:", workers=4) as storage:
+            await storage.save_characters(characters)
+            loads = [storage.load_character(character.id) for character in characters * 20]
+            return await asyncio.wait_for(asyncio.gather(*loads), timeout=10)
+
+    loaded = asyncio.run(run())
+
+    assert [character.id for character in loaded[:3]] == [c.id for c in characters]
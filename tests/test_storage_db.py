@@ -0,0 +1,114 @@
+import random
+import sqlite3
+import threading
+
+import pytest
+
+from src.services import CharacterGenerationService
+from src import storage_db
+from src.storage_db import CharacterStorage
+
+
+@pytest.fixture
+def characters():
+    return list(CharacterGenerationService(random.Random(1)).random_characters(3))
+
+
+@pytest.fixture
+def storage(tmp_path):
+    with CharacterStorage(tmp_path / "characters.db") as storage:
+        yield storage
+
+
+@pytest.mark.parametrize("stored", [False, True])
+def test_repeated_id_in_a_batch_keeps_the_last_save(storage, characters, stored):
+    character = characters[0]
+    if stored:
+        storage.save_character(character)
+    renamed = character.with_changes(name="Gale2", skills=list(reversed(character.skills)))
+
+    storage.save_characters([character, characters[1], renamed])
+
+    assert storage.load_character(character.id).to_dict() == renamed.to_dict()
+    assert len(storage.load_all_characters()) == 2
+    assert [result.id for result in storage.search("Gale2")] == [character.id]
+
+
+def test_nested_borrow_of_the_only_connection_raises(characters):
+    with CharacterStorage(":memory:") as storage:
+        with pytest.raises(sqlite3.ProgrammingError):
+            with storage.read_transaction():
+                storage.save_character(characters[0])
+        storage.save_character(characters[0])
+        assert storage.load_character(characters[0].id) is not None
+
+
+def _pool(size, timeout=30.0):
+    def connect():
+        return sqlite3.connect(":memory:", check_same_thread=False)
+
+    pool_class = storage_db._ConnectionPool  # pylint: disable=protected-access
+    return pool_class(connect, size, timeout=timeout)
+
+
+def test_waiting_for_a_connection_times_out():
+    pool = _pool(1, timeout=0.2)
+    held = pool.acquire()
+    errors = []
+
+    thread = threading.Thread(target=lambda: errors.append(_try_acquire(pool)))
+    thread.start()
+    thread.join(5)
+
+    assert isinstance(errors[0], sqlite3.OperationalError)
+    pool.release(held)
+    pool.close()
+
+
+def test_close_wakes_waiting_threads():
+    pool = _pool(1)
+    pool.acquire()
+    errors = []
+
+    thread = threading.Thread(target=lambda: errors.append(_try_acquire(pool)))
+    thread.start()
+    thread.join(0.3)
+    pool.close()
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert isinstance(errors[0], sqlite3.ProgrammingError)
+
+
+def _try_acquire(pool):
+    try:
+        pool.acquire()
+    except sqlite3.Error as error:
+        return error
+    return None
+
+
+def test_query_filters_by_keyword_or_filters_object(storage):
+    storage.save_characters(CharacterGenerationService(random.Random(4)).random_characters(60))
+    everyone = storage.load_all_characters()
+    character = everyone[7]
+    skill = character.skills[0]
+    expected = [
+        c.id for c in everyone
+        if c.race == character.race and skill in c.skills and c.ability_scores.STR >= 10
+    ]
+
+    by_keyword = storage.query(race=character.race, skills=[skill], min_scores={"STR": 10})
+    filters = storage_db.CharacterFilters(
+        race=[character.race], skills=[skill], min_scores={"STR": 10}
+    )
+    by_object = storage.query(filters, limit=2, offset=1)
+
+    assert [c.id for c in by_keyword] == expected
+    assert [c.id for c in by_object] == expected[1:3]
+    with pytest.raises(TypeError):
+        storage.query(filters, race="Elf")
+    with pytest.raises(TypeError):
+        storage.query(colour="red")
+    with pytest.raises(ValueError):
+        storage.query(min_scores={"LUCK": 3})
@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from src.services import CharacterGenerationService
+from src.validation import VALIDATOR
+
+GOOD = {
+    "name": "Gale",
+    "origin": "Gale",
+    "race": "Human",
+    "character_class": "Wizard",
+    "subclass": "Evocation",
+    "background": "Sage",
+    "base_scores": {"STR": 8, "DEX": 14, "CON": 14, "INT": 15, "WIS": 10, "CHA": 10},
+    "plus_two_ability": "INT",
+    "plus_one_ability": "CON",
+    "skills": ["Arcana", "History", "Insight", "Perception"],
+    "feats": [],
+}
+
+
+def test_good_choices_have_no_errors():
+    assert not VALIDATOR.errors(GOOD)
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"origin": ["x"]},
+        {"race": {"a": 1}},
+        {"character_class": ["Wizard"]},
+        {"subclass": ["Evocation"]},
+        {"background": None},
+        {"name": None},
+        {"base_scores": {**GOOD["base_scores"], "STR": [8]}},
+        {"base_scores": {**GOOD["base_scores"], "STR": "8"}},
+        {"plus_two_ability": ["INT"]},
+        {"skills": None},
+        {"skills": [["Arcana"], "History", "Insight", "Perception"]},
+        {"feats": 3},
+        {"feats": [{"Alert": 1}]},
+    ],
+)
+def test_validate_many_reports_bad_types(changes):
+    service = CharacterGenerationService(random.Random(1))
+
+    results = list(service.validate_many([GOOD, {**GOOD, **changes}, GOOD]))
+
+    assert [result.ok for result in results] == [True, False, True]
+    assert all(isinstance(error, str) for error in results[1].errors)
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"id": ""},
+        {"id": None},
+        {"name": ""},
+        {"name": 3},
+        {"ability_scores": {"STR": 8}},
+        {"ability_scores": None},
+        {"ability_bonuses": [("STR", 2)]},
+        {"ability_bonuses": {"STR": "2"}},
+        {"ability_bonuses": {("STR",): 2}},
+        {"origin": ["Gale"]},
+        {"character_class": {"Wizard": 1}},
+        {"subclass": ["Evocation"]},
+    ],
+)
+def test_with_changes_rejects_bad_values(changes):
+    character = CharacterGenerationService(random.Random(1)).random_character("Tav")
+
+    with pytest.raises(ValueError):
+        character.with_changes(**changes)